@@ -0,0 +1,342 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import struct
+import zlib
+from urllib.parse import quote
+
+from aiohttp import web
+
+
+class ServiceProfile:
+    """
+    Latency and error injection for one fake service.
+    Every request waits latency_ms (+/- jitter_ms) and fails with HTTP 503 at `error_rate`.
+    """
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+
+    async def delay(self) -> bool:
+        """
+        Sleeps for the configured latency. Returns True when this request should fail.
+        """
+        latency = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+        return random.random() < self.error_rate
+
+
+def make_png(width: int, height: int) -> bytes:
+    """
+    Builds a valid, blank greyscale PNG of the given size.
+    """
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    rows = b"".join(b"\x00" + b"\xff" * width for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 9)) + chunk(b"IEND", b"")
+
+
+LOGO_PNG = make_png(512, 512)
+OG_PNG = make_png(1200, 630)
+FAVICON_PNG = make_png(16, 16)
+
+FEATURES = [
+    "Generate on-brand copy, images and video from a single prompt.",
+    "Collaborate with your team in shared workspaces with comments and version history.",
+    "Connect to Slack, Notion, Google Drive and over 200 other apps with one click.",
+    "Automate repetitive workflows with triggers, schedules and conditional steps.",
+    "Analyze results with dashboards that update in real time.",
+    "Enterprise-grade security with SSO, audit logs and data residency controls.",
+]
+
+FAQ = [
+    ("Is there a free plan?", "Yes, the Starter plan is free forever for individuals."),
+    ("Can I cancel anytime?", "Plans are billed monthly and can be cancelled at any time."),
+    ("Do you offer an API?", "Every paid plan includes API access with generous rate limits."),
+]
+
+
+def tool_page(number: int, base_url: str, js_only: bool = False) -> str:
+    """
+    A synthetic tool home page with features, FAQ, a pricing link, og:image and (on even
+    numbers) a YouTube embed.
+    JavaScript-only pages ship an empty shell that a script fills in, forcing the browser tier.
+    """
+    name = f"Benchtool {number}"
+    features = "".join(f"<li>{feature}</li>" for feature in FEATURES)
+    # Half the sites embed their own video, the rest leave it to the YouTube search.
+    video = f"<iframe src='https://www.youtube.com/embed/bench{number:06d}'></iframe>" if number % 2 == 0 else ""
+    faq = "".join(f"<h3>{question}</h3><p>{answer}</p>" for question, answer in FAQ)
+    body = (
+        f"<header><img src='/img/logo-{number}.png' alt='{name} logo' width='512' height='512'>"
+        f"<nav><a href='/sites/{number}/pricing'>Pricing</a> <a href='/sites/{number}/docs'>Docs</a></nav></header>"
+        f"<main><h1>{name}: the AI workspace for busy teams</h1>"
+        f"<p>{name} helps marketing, sales and product teams ship twice as much work without adding headcount.</p>"
+        f"<h2>Features</h2><ul>{features}</ul><h2>FAQ</h2>{faq}{video}</main>"
+        f"<footer><a href='https://twitter.com/benchtool{number}'>Twitter</a> Copyright {name}</footer>"
+    )
+    if js_only:
+        body = f"<div id='app'>Loading...</div><script>document.getElementById('app').innerHTML = {json.dumps(body)};</script>"
+    return (
+        f"<!doctype html><html><head><title>{name}</title>"
+        f"<meta property='og:image' content='{base_url}/img/og-{number}.png'>"
+        f"<link rel='icon' href='/img/favicon-{number}.png'></head><body>{body}</body></html>"
+    )
+
+
+def pricing_page(number: int, repriced: bool = False) -> str:
+    pro_price = "$29/month" if repriced else "$19/month"
+    plans = [("Starter", "Free"), ("Pro", pro_price), ("Business", "$49/user/month"), ("Enterprise", "Contact sales")]
+    rows = "".join(
+        f"<div class='plan'><h2>{plan}</h2><p>{price}</p><p>Everything in the plan before, plus more seats, "
+        f"more storage, higher API limits and faster support response times.</p></div>"
+        for plan, price in plans
+    )
+    faq = "".join(f"<h3>{question}</h3><p>{answer}</p>" for question, answer in FAQ)
+    return (
+        f"<!doctype html><html><head><title>Benchtool {number} pricing</title></head>"
+        f"<body><h1>Pricing</h1>{rows}<h2>Pricing FAQ</h2>{faq}</body></html>"
+    )
+
+
+def docs_page(number: int) -> str:
+    steps = [
+        "Create a workspace and invite your team from the Members tab.",
+        "Connect your first integration under Settings, then choose which projects it can see.",
+        "Build a workflow from a template or start from a blank canvas and add triggers.",
+        "Publish the workflow and watch each run in the activity log, with retries for failed steps.",
+    ]
+    guide = "".join(f"<li>{step}</li>" for step in steps)
+    return (
+        f"<!doctype html><html><head><title>Benchtool {number} docs</title></head>"
+        f"<body><h1>Getting started with Benchtool {number}</h1><ol>{guide}</ol>"
+        f"<h2>API</h2><p>Every workspace has a REST API with token authentication, webhooks for run events "
+        f"and client libraries for Python and JavaScript. Requests are limited to 600 per minute on paid plans.</p></body></html>"
+    )
+
+
+def generated_article(prompt: str) -> str:
+    # Mirrors the shape of a real answer: headings, paragraphs and markdown links for convert_links().
+    match = re.search(r"- Tool Name:\s*(.+)", prompt)
+    name = match.group(1).strip() if match else "This tool"
+    sections = []
+    for heading in ("Overview", "Key Features", "Pricing", "Who It's For", "FAQ"):
+        paragraph = (
+            f"{name} is covered here in detail. It combines automation, collaboration and analytics "
+            f"so teams can move faster. Learn more at [the official site](https://example.com/{quote(name)}) "
+            f"or read the [documentation](https://example.com/{quote(name)}/docs). "
+        ) * 3
+        sections.append(f"## {heading}\n\n{paragraph}\n")
+    return f"# {name} Review\n\n" + "\n".join(sections)
+
+
+def gemini_answer(prompt: str) -> str:
+    match = re.search(r"Categories:\s*(.+)", prompt)
+    if match:
+        categories = [c.strip() for c in match.group(1).split(",") if c.strip() not in ("", "AI", "Crypto")]
+        # Batched genre prompts number their tools and ask for JSON.
+        numbers = re.findall(r"^\s*### Tool (\d+):", prompt, re.MULTILINE)
+        if numbers:
+            return json.dumps({"tools": [{"id": int(number), "genres": categories[:2]} for number in numbers]})
+        return ", ".join(categories[:2])
+    return generated_article(prompt)
+
+
+def create_fake_app(profiles: dict, pages_dir: str = None, js_fraction: float = 0.0) -> web.Application:
+    """
+    One aiohttp app serving every stand-in, each with its own ServiceProfile:
+      "gemini":  POST /v1beta/models/<model>:generateContent and :streamGenerateContent (Gemini REST API)
+      "youtube": GET /youtube/v3/search and /youtube/v3/videos (YouTube Data API)
+      "google":  GET /search (image results with tbm=isch, "People also ask" otherwise)
+      "site":    GET /sites/<n>/, /sites/<n>/pricing, /sites/<n>/docs, /pages/<file> and /img/<name> (honours Range)
+    Site pages carry an ETag and answer a matching If-None-Match with 304.
+    GET /_stats returns per-service request and error counts, and POST /_sites/<n>/reprice
+    raises site n's Pro plan price, for testing `gemini_main.py refresh`.
+    """
+    app = web.Application()
+    stats = {service: {"requests": 0, "errors": 0} for service in ("gemini", "youtube", "google", "site")}
+    app["stats"] = stats
+    videos = {}
+    repriced = set()
+
+    async def guarded(service: str, request: web.Request):
+        stats[service]["requests"] += 1
+        if await profiles[service].delay():
+            stats[service]["errors"] += 1
+            return web.Response(status=503, text="Injected failure")
+        return None
+
+    def base_url(request: web.Request) -> str:
+        return f"{request.scheme}://{request.host}"
+
+    async def gemini(request: web.Request) -> web.Response:
+        failure = await guarded("gemini", request)
+        if failure:
+            return failure
+        body = await request.json()
+        prompt = "".join(part.get("text", "") for content in body.get("contents", []) for part in content.get("parts", []))
+        text = gemini_answer(prompt)
+        usage = {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": len(text) // 4}
+        if not request.match_info["action"].endswith(":streamGenerateContent"):
+            return web.json_response({
+                "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+                "usageMetadata": usage,
+            })
+        # The REST transport streams a JSON array of responses. The configured latency is
+        # the time to the first chunk; the rest arrive spread over the same time again.
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await response.prepare(request)
+        pieces = [text[i:i + 200] for i in range(0, len(text), 200)]
+        for i, piece in enumerate(pieces):
+            chunk = {"candidates": [{"content": {"parts": [{"text": piece}], "role": "model"}, "index": 0}]}
+            if i == len(pieces) - 1:
+                chunk["candidates"][0]["finishReason"] = "STOP"
+                chunk["usageMetadata"] = usage
+            await response.write((("[" if i == 0 else ",\r\n") + json.dumps(chunk)).encode("utf-8"))
+            if i < len(pieces) - 1:
+                await asyncio.sleep(profiles["gemini"].latency_ms / 1000 / len(pieces))
+        await response.write(b"]")
+        await response.write_eof()
+        return response
+
+    async def youtube_search(request: web.Request) -> web.Response:
+        failure = await guarded("youtube", request)
+        if failure:
+            return failure
+        query = request.query.get("q", "")
+        count = min(int(request.query.get("maxResults", "5")), 50)
+        digest = hashlib.sha256(query.encode("utf-8")).hexdigest()
+        items = [
+            {"kind": "youtube#searchResult", "id": {"kind": "youtube#video", "videoId": f"{digest[:10]}{i}"},
+             "snippet": {"title": f"{query} #{i + 1}", "channelTitle": "Bench Channel"}}
+            for i in range(count)
+        ]
+        for i, item in enumerate(items):
+            # The top result is a Short, so ranking by videos().list has something to change.
+            videos[item["id"]["videoId"]] = {
+                "title": item["snippet"]["title"],
+                "viewCount": str(int(digest[i * 4:i * 4 + 4], 16) * 10),
+                "duration": "PT45S" if i == 0 else f"PT{3 + i}M{i * 7}S",
+            }
+        return web.json_response({"kind": "youtube#searchListResponse", "items": items, "pageInfo": {"totalResults": count}})
+
+    async def youtube_videos(request: web.Request) -> web.Response:
+        failure = await guarded("youtube", request)
+        if failure:
+            return failure
+        items = [
+            {"kind": "youtube#video", "id": video_id,
+             "snippet": {"title": videos[video_id]["title"], "channelTitle": "Bench Channel"},
+             "statistics": {"viewCount": videos[video_id]["viewCount"]},
+             "contentDetails": {"duration": videos[video_id]["duration"]}}
+            for video_id in request.query.get("id", "").split(",") if video_id in videos
+        ]
+        return web.json_response({"kind": "youtube#videoListResponse", "items": items})
+
+    async def google_search(request: web.Request) -> web.Response:
+        failure = await guarded("google", request)
+        if failure:
+            return failure
+        query = request.query.get("q", "")
+        slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-")
+        if request.query.get("tbm") == "isch":
+            images = "".join(f"<img src='{base_url(request)}/img/{slug}-{i}.png'>" for i in range(5))
+            return web.Response(text=f"<html><body>{images}</body></html>", content_type="text/html")
+        name = query.replace(" questions", "")
+        questions = "".join(
+            f"<div class='related-question-pair'>{question.format(name=name)}</div>"
+            for question in ("What is {name}?", "Is {name} free?", "How does {name} work?", "Is {name} safe?", "What are alternatives to {name}?")
+        )
+        return web.Response(text=f"<html><body>{questions}</body></html>", content_type="text/html")
+
+    def html_response(request: web.Request, text: str) -> web.Response:
+        etag = '"' + hashlib.sha256(text.encode("utf-8")).hexdigest()[:16] + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=text, content_type="text/html", headers={"ETag": etag})
+
+    async def site_page(request: web.Request) -> web.Response:
+        failure = await guarded("site", request)
+        if failure:
+            return failure
+        number = int(request.match_info["number"])
+        page = request.match_info.get("page", "")
+        if page == "pricing":
+            return html_response(request, pricing_page(number, number in repriced))
+        if page == "docs":
+            return html_response(request, docs_page(number))
+        if page:
+            raise web.HTTPNotFound()
+        # Spread JavaScript-only pages evenly so every batch size gets its share.
+        js_only = js_fraction > 0 and number % max(1, round(1 / js_fraction)) == 0
+        return html_response(request, tool_page(number, base_url(request), js_only))
+
+    async def reprice(request: web.Request) -> web.Response:
+        repriced.add(int(request.match_info["number"]))
+        return web.json_response({"repriced": sorted(repriced)})
+
+    async def saved_page(request: web.Request) -> web.Response:
+        failure = await guarded("site", request)
+        if failure:
+            return failure
+        name = os.path.basename(request.match_info["name"])
+        path = os.path.join(pages_dir or "", name)
+        if not pages_dir or not os.path.isfile(path):
+            raise web.HTTPNotFound()
+        return web.FileResponse(path)
+
+    async def image(request: web.Request) -> web.Response:
+        failure = await guarded("site", request)
+        if failure:
+            return failure
+        name = request.match_info["name"]
+        body = LOGO_PNG
+        if name.startswith("og-"):
+            # Every fifth site has a broken og:image, so image validation has work to do.
+            match = re.match(r"og-(\d+)", name)
+            if match and int(match.group(1)) % 5 == 0:
+                raise web.HTTPNotFound()
+            body = OG_PNG
+        elif name.startswith("favicon-"):
+            body = FAVICON_PNG
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", request.headers.get("Range", ""))
+        if match and int(match.group(1)) < len(body):
+            start = int(match.group(1))
+            end = min(int(match.group(2) or len(body) - 1), len(body) - 1)
+            return web.Response(
+                status=206, body=body[start:end + 1], content_type="image/png",
+                headers={"Content-Range": f"bytes {start}-{end}/{len(body)}"},
+            )
+        return web.Response(body=body, content_type="image/png")
+
+    async def get_stats(request: web.Request) -> web.Response:
+        return web.json_response(stats)
+
+    app.router.add_post("/v1beta/models/{action}", gemini)
+    app.router.add_get("/youtube/v3/search", youtube_search)
+    app.router.add_get("/youtube/v3/videos", youtube_videos)
+    app.router.add_get("/search", google_search)
+    app.router.add_get(r"/sites/{number:\d+}/", site_page)
+    app.router.add_get(r"/sites/{number:\d+}/{page}", site_page)
+    app.router.add_get("/pages/{name}", saved_page)
+    app.router.add_get("/img/{name}", image)
+    app.router.add_get("/_stats", get_stats)
+    app.router.add_post(r"/_sites/{number:\d+}/reprice", reprice)
+    return app
+
+
+def saved_pages(pages_dir: str) -> list[str]:
+    """
+    Lists the .html files in `pages_dir` that can be served as tool sites under /pages/.
+    """
+    if not pages_dir or not os.path.isdir(pages_dir):
+        return []
+    return sorted(name for name in os.listdir(pages_dir) if name.endswith((".html", ".htm")))
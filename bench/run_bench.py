@@ -0,0 +1,322 @@
+"""
+Offline end-to-end benchmark for gemini_main.py.
+
+Starts local stand-ins for Gemini, the YouTube Data API, Google search/images and the tool
+sites (see fake_services.py), then runs the real single-tool and --tools_file commands
+against them at several batch sizes and concurrency levels. Each run gets a fresh working
+directory and cache, so runs are independent and no API quota is used.
+
+    python bench/run_bench.py --sizes 10,50 --concurrency 1,4,8 --gemini_latency_ms 1500
+
+Results (p50/p95 per-tool latency, tools/minute, peak RSS, peak browser processes and the
+number of calls each fake service received) are printed and saved as JSON. Pass
+--baseline with an earlier results file to print the change for matching scenarios.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import psutil
+from aiohttp import web
+
+from fake_services import ServiceProfile, create_fake_app, saved_pages
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+from metrics import percentile
+MAIN_SCRIPT = os.path.join(REPO_DIR, "gemini_main.py")
+
+
+def int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+class ProcessSampler:
+    """
+    Polls a process tree for its combined RSS and the number of Chromium processes,
+    keeping the peaks.
+    """
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        self.pid = pid
+        self.interval = interval
+        self.peak_rss_mb = 0.0
+        self.peak_browser_processes = 0
+
+    def sample(self):
+        try:
+            root = psutil.Process(self.pid)
+            processes = [root] + root.children(recursive=True)
+        except psutil.Error:
+            return
+        rss = 0
+        browsers = 0
+        for process in processes:
+            try:
+                rss += process.memory_info().rss
+                name = process.name().lower()
+            except psutil.Error:
+                continue
+            if "chrom" in name or "headless_shell" in name:
+                browsers += 1
+        self.peak_rss_mb = max(self.peak_rss_mb, rss / (1024 * 1024))
+        self.peak_browser_processes = max(self.peak_browser_processes, browsers)
+
+    async def run(self):
+        while True:
+            await asyncio.to_thread(self.sample)
+            await asyncio.sleep(self.interval)
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.base_url = f"http://127.0.0.1:{args.port}"
+        self.stats = None
+        self.pages = saved_pages(args.pages_dir)
+
+    def tool(self, number: int) -> tuple[str, str]:
+        # Saved pages are used first, then synthetic sites.
+        if number <= len(self.pages):
+            page = self.pages[number - 1]
+            return os.path.splitext(page)[0].replace("_", " ").title(), f"{self.base_url}/pages/{page}"
+        return f"Benchtool {number}", f"{self.base_url}/sites/{number}/"
+
+    def child_env(self, workdir: str) -> dict:
+        env = dict(os.environ)
+        env.update({
+            "GEMINI_API_KEY": "bench-key",
+            "YOUTUBE_API_KEY": "bench-key",
+            "GEMINI_API_ENDPOINT": self.base_url,
+            "YOUTUBE_API_ENDPOINT": f"{self.base_url}/",
+            "GOOGLE_SEARCH_URL": f"{self.base_url}/search",
+            "CACHE_DIR": os.path.join(workdir, ".cache"),
+            # Every fake shares one host, so the per-host connection cap would otherwise
+            # throttle sites and APIs together.
+            "HTTP_MAX_PER_HOST": str(self.args.http_max_per_host),
+            "PYTHONUNBUFFERED": "1",
+        })
+        if not self.args.keep_rate_limits:
+            env.update({"GEMINI_RPM": "0", "YOUTUBE_RPM": "0", "GOOGLE_RPM": "0"})
+        return env
+
+    def reset_stats(self) -> dict:
+        snapshot = json.loads(json.dumps(self.stats))
+        for counters in self.stats.values():
+            for name in counters:
+                counters[name] = 0
+        return snapshot
+
+    async def run_command(self, command: list[str], workdir: str, log_name: str) -> tuple[float, int, ProcessSampler]:
+        log_path = os.path.join(workdir, log_name)
+        with open(log_path, "w", encoding="utf-8") as log:
+            started = time.monotonic()
+            process = await asyncio.create_subprocess_exec(
+                *command, cwd=workdir, env=self.child_env(workdir), stdout=log, stderr=subprocess.STDOUT,
+            )
+            sampler = ProcessSampler(process.pid)
+            sampling = asyncio.create_task(sampler.run())
+            try:
+                returncode = await asyncio.wait_for(process.wait(), timeout=self.args.timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                returncode = await process.wait()
+                print(f"  timed out after {self.args.timeout}s, see {log_path}")
+            finally:
+                sampling.cancel()
+            wall = time.monotonic() - started
+        if returncode != 0:
+            print(f"  exited with {returncode}, see {log_path}")
+        return wall, returncode, sampler
+
+    async def single_tool(self, workdir: str) -> dict:
+        latencies = []
+        samplers = []
+        for run in range(self.args.repeats):
+            name, url = self.tool(run + 1)
+            command = [sys.executable, MAIN_SCRIPT, name, url] + self.args.extra
+            wall, returncode, sampler = await self.run_command(command, workdir, f"single-{run + 1}.log")
+            if returncode == 0:
+                latencies.append(wall)
+            samplers.append(sampler)
+        total = sum(latencies)
+        return {
+            "mode": "single",
+            "tools": self.args.repeats,
+            "concurrency": 1,
+            "processes": 1,
+            "done": len(latencies),
+            "failed": self.args.repeats - len(latencies),
+            "wall_seconds": round(total, 3),
+            "tools_per_minute": round(len(latencies) / total * 60, 2) if total else 0.0,
+            # Includes interpreter start-up, since that is part of a real single-tool run.
+            "latency_p50": percentile(latencies, 0.50),
+            "latency_p95": percentile(latencies, 0.95),
+            "peak_rss_mb": round(max(s.peak_rss_mb for s in samplers), 1),
+            "peak_browser_processes": max(s.peak_browser_processes for s in samplers),
+        }
+
+    async def batch(self, workdir: str, size: int, concurrency: int, processes: int) -> dict:
+        tools_file = os.path.join(workdir, "tools.md")
+        with open(tools_file, "w", encoding="utf-8") as f:
+            for number in range(1, size + 1):
+                name, url = self.tool(number)
+                f.write(f"{name} | {url}\n")
+        command = [
+            sys.executable, MAIN_SCRIPT, "--tools_file", tools_file,
+            "--concurrency", str(concurrency), "--processes", str(processes),
+        ] + self.args.extra
+        wall, returncode, sampler = await self.run_command(command, workdir, "batch.log")
+        latencies, done, failed = [], 0, 0
+        journal_path = os.path.join(workdir, "output_csv", "all_tools.csv.journal.jsonl")
+        if os.path.exists(journal_path):
+            with open(journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue
+                    if record.get("stage") != "tool":
+                        continue
+                    if record.get("status") == "done":
+                        done += 1
+                    else:
+                        failed += 1
+                    if "seconds" in record:
+                        latencies.append(record["seconds"])
+        return {
+            "mode": "batch",
+            "tools": size,
+            "concurrency": concurrency,
+            "processes": processes,
+            "done": done,
+            "failed": failed,
+            "wall_seconds": round(wall, 3),
+            "tools_per_minute": round(done / wall * 60, 2) if wall else 0.0,
+            "latency_p50": percentile(latencies, 0.50),
+            "latency_p95": percentile(latencies, 0.95),
+            "peak_rss_mb": round(sampler.peak_rss_mb, 1),
+            "peak_browser_processes": sampler.peak_browser_processes,
+        }
+
+    def scenarios(self) -> list[tuple]:
+        scenarios = []
+        if not self.args.skip_single:
+            scenarios.append(("single",))
+        for size in int_list(self.args.sizes):
+            for concurrency in int_list(self.args.concurrency):
+                for processes in int_list(self.args.processes):
+                    scenarios.append(("batch", size, concurrency, processes))
+        return scenarios
+
+    async def run(self) -> list[dict]:
+        a = self.args
+        profiles = {
+            "gemini": ServiceProfile(a.gemini_latency_ms, a.jitter_ms, a.error_rate),
+            "youtube": ServiceProfile(a.youtube_latency_ms, a.jitter_ms, a.error_rate),
+            "google": ServiceProfile(a.google_latency_ms, a.jitter_ms, a.error_rate),
+            "site": ServiceProfile(a.site_latency_ms, a.jitter_ms, a.error_rate),
+        }
+        app = create_fake_app(profiles, pages_dir=a.pages_dir, js_fraction=a.js_fraction)
+        self.stats = app["stats"]
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", a.port).start()
+        print(f"Fake services listening on {self.base_url}")
+        results = []
+        try:
+            for scenario in self.scenarios():
+                workdir = tempfile.mkdtemp(prefix="techceo-bench-")
+                label = "single tool" if scenario[0] == "single" else f"batch of {scenario[1]}, concurrency {scenario[2]}, processes {scenario[3]}"
+                print(f"Running {label} in {workdir}")
+                self.reset_stats()
+                if scenario[0] == "single":
+                    result = await self.single_tool(workdir)
+                else:
+                    result = await self.batch(workdir, *scenario[1:])
+                result["service_requests"] = self.reset_stats()
+                results.append(result)
+                print(
+                    f"  {result['done']}/{result['tools']} done, {result['tools_per_minute']} tools/min, "
+                    f"p50 {result['latency_p50']}s, p95 {result['latency_p95']}s, peak RSS {result['peak_rss_mb']} MB, "
+                    f"browsers {result['peak_browser_processes']}"
+                )
+                if a.keep_workdirs:
+                    result["workdir"] = workdir
+                else:
+                    shutil.rmtree(workdir, ignore_errors=True)
+        finally:
+            await runner.cleanup()
+        return results
+
+
+def scenario_key(result: dict) -> tuple:
+    return (result["mode"], result["tools"], result["concurrency"], result["processes"])
+
+
+def print_comparison(results: list[dict], baseline_path: str):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {scenario_key(r): r for r in json.load(f)["results"]}
+    print(f"\nCompared with {baseline_path}:")
+    for result in results:
+        before = baseline.get(scenario_key(result))
+        if not before:
+            continue
+        changes = []
+        for field in ("tools_per_minute", "latency_p50", "latency_p95", "peak_rss_mb"):
+            if before.get(field) and result.get(field) is not None:
+                change = (result[field] - before[field]) / before[field] * 100
+                changes.append(f"{field} {before[field]} -> {result[field]} ({change:+.1f}%)")
+        print(f"  {scenario_key(result)}: " + ", ".join(changes))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark gemini_main.py against local fake services.")
+    parser.add_argument("--sizes", default="10,50", help="Comma-separated batch sizes.")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated --concurrency values.")
+    parser.add_argument("--processes", default="1", help="Comma-separated --processes values.")
+    parser.add_argument("--repeats", type=int, default=3, help="Number of single-tool runs.")
+    parser.add_argument("--skip_single", action="store_true", help="Only benchmark --tools_file batches.")
+    parser.add_argument("--gemini_latency_ms", type=float, default=1200)
+    parser.add_argument("--youtube_latency_ms", type=float, default=150)
+    parser.add_argument("--google_latency_ms", type=float, default=300)
+    parser.add_argument("--site_latency_ms", type=float, default=200)
+    parser.add_argument("--jitter_ms", type=float, default=50, help="Random +/- added to every latency.")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503.")
+    parser.add_argument("--js_fraction", type=float, default=0.0, help="Fraction of synthetic sites that need JavaScript (browser tier).")
+    parser.add_argument("--pages_dir", help="Directory of saved .html pages to serve as tool sites before synthetic ones.")
+    parser.add_argument("--keep_rate_limits", action="store_true", help="Keep the default per-service rate limits instead of disabling them.")
+    parser.add_argument("--http_max_per_host", type=int, default=64, help="HTTP_MAX_PER_HOST for the runs, since all fakes share one host.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=1800, help="Seconds before a run is killed.")
+    parser.add_argument("--keep_workdirs", action="store_true", help="Keep each run's output, caches and logs.")
+    parser.add_argument("--output", help="Results file (default: bench/results/bench-<time>.json).")
+    parser.add_argument("--baseline", help="Earlier results file to compare against.")
+    parser.add_argument("extra", nargs=argparse.REMAINDER, help="Extra gemini_main.py flags after --, e.g. -- --browser_only")
+    args = parser.parse_args()
+    args.extra = [item for item in args.extra if item != "--"]
+
+    started = time.strftime("%Y-%m-%dT%H:%M:%S")
+    results = asyncio.run(Bench(args).run())
+    output = args.output or os.path.join(BENCH_DIR, "results", f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    settings = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"started": started, "commit": git_commit(), "settings": settings, "results": results}, f, indent=2)
+    print(f"Saved results to {output}")
+    if args.baseline:
+        print_comparison(results, args.baseline)
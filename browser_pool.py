@@ -0,0 +1,305 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+import psutil
+from playwright.async_api import async_playwright
+
+# Resource types the scraper never needs: we only read the page's text and HTML.
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+
+# Third-party analytics, ad and chat-widget hosts. Subdomains are blocked too.
+BLOCKED_HOSTS = (
+    "google-analytics.com", "googletagmanager.com", "googleadservices.com", "doubleclick.net",
+    "facebook.net", "connect.facebook.com", "hotjar.com", "hotjar.io", "clarity.ms", "segment.com",
+    "segment.io", "mixpanel.com", "amplitude.com", "fullstory.com", "heap.io", "heapanalytics.com",
+    "intercom.io", "intercomcdn.com", "drift.com", "driftt.com", "crisp.chat", "tawk.to",
+    "zdassets.com", "zopim.com", "hs-scripts.com", "hs-analytics.net", "hsadspixel.net",
+    "licdn.com", "ads-twitter.com", "analytics.tiktok.com", "bat.bing.com", "optimizely.com",
+    "nr-data.net", "newrelic.com", "sentry.io", "browser-intake-datadoghq.com", "cookielaw.org",
+)
+
+
+def is_blocked_host(host: str, page_host: str = "") -> bool:
+    """
+    True if `host` is a known third-party tracker. A site's own domain is never blocked.
+    """
+    host = host.lower()
+    for blocked in BLOCKED_HOSTS:
+        if host == blocked or host.endswith("." + blocked):
+            return not (page_host == blocked or page_host.endswith("." + blocked))
+    return False
+
+
+class BrowserPool:
+    """
+    Keeps a few long-lived Chromium processes and hands out isolated browser contexts.
+    Every scrape gets a new context, closed when the scrape is done, so no cookies or storage
+    carry over between tools. A browser is replaced after serving `pages_per_browser` scrapes
+    or when the Chromium processes grow past `max_rss_mb`, so memory stays steady on long
+    runs; scrapes still using the old browser finish there before it is closed.
+    With `block_resources` on, pages abort image/media/font/stylesheet requests and known
+    tracker hosts, and count what was skipped.
+    """
+
+    def __init__(self, browsers: int = 1, max_pages: int = 4, pages_per_browser: int = 200, max_rss_mb: int = 1500,
+                 block_resources: bool = True):
+        self.browsers = max(1, browsers)
+        self.max_pages = max(1, max_pages)
+        self.pages_per_browser = max(1, pages_per_browser)
+        self.max_rss_mb = max_rss_mb
+        self.block_resources = block_resources
+        self.blocked_resource_types = set(BLOCKED_RESOURCE_TYPES)
+        self._playwright = None
+        self._slots = []
+        self._slot_cycle = None
+        self._page_slots = None
+        self._start_lock = None
+        self._rss_checked_at = 0.0
+        self._rss_exceeded = False
+        self._page_stats = {}
+        self.stats = {
+            "browsers_launched": 0, "browsers_recycled": 0, "contexts_created": 0, "pages_served": 0,
+            "requests_blocked": 0, "requests_allowed": 0, "declared_bytes": 0,
+        }
+
+    def configure(self, browsers: int = None, max_pages: int = None, pages_per_browser: int = None, max_rss_mb: int = None,
+                  block_resources: bool = None):
+        """
+        Changes the pool limits. Takes effect the next time the pool is started.
+        """
+        if browsers is not None:
+            self.browsers = max(1, browsers)
+        if max_pages is not None:
+            self.max_pages = max(1, max_pages)
+        if pages_per_browser is not None:
+            self.pages_per_browser = max(1, pages_per_browser)
+        if max_rss_mb is not None:
+            self.max_rss_mb = max_rss_mb
+        if block_resources is not None:
+            self.block_resources = block_resources
+
+    async def start(self):
+        """
+        Starts Playwright. Browsers themselves are launched on first use.
+        """
+        if self._playwright:
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._playwright:
+                return
+            self._slots = [{"browser": None, "pages": 0, "retired": [], "lock": asyncio.Lock()} for _ in range(self.browsers)]
+            self._slot_cycle = itertools.cycle(self._slots)
+            self._page_slots = asyncio.Semaphore(self.max_pages)
+            self._playwright = await async_playwright().start()
+
+    async def close(self):
+        """
+        Closes every context and browser and stops Playwright.
+        """
+        if not self._playwright:
+            return
+        for slot in self._slots:
+            await self._close_browser(slot)
+        await self._playwright.stop()
+        self._playwright = None
+        self._slots = []
+        self._start_lock = None
+
+    @asynccontextmanager
+    async def page(self):
+        """
+        Yields a fresh page in a new context of its own.
+        Waits while the pool is already serving `max_pages` pages.
+        """
+        await self.start()
+        async with self._page_slots:
+            slot = next(self._slot_cycle)
+            context = await self._acquire_context(slot)
+            page = None
+            try:
+                page = await context.new_page()
+                await self._track_page(page)
+                yield page
+            finally:
+                if page:
+                    await self._close_page(page)
+                await self._release_context(slot, context)
+
+    @asynccontextmanager
+    async def sibling_page(self, page):
+        """
+        Yields another page in the same context as `page` (one handed out by `page()`),
+        e.g. to load several pages of a site in parallel. Sibling pages don't wait for a
+        `max_pages` slot, so callers must limit how many they open.
+        """
+        context = page.context
+        sibling = await context.new_page()
+        try:
+            await self._track_page(sibling)
+            yield sibling
+        finally:
+            await self._close_page(sibling)
+            self.stats["pages_served"] += 1
+
+    async def _close_page(self, page):
+        stats = self._page_stats.pop(id(page), {})
+        self.stats["requests_blocked"] += stats.get("requests_blocked", 0)
+        self.stats["requests_allowed"] += stats.get("requests_allowed", 0)
+        self.stats["declared_bytes"] += stats.get("declared_bytes", 0)
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+    def page_stats(self, page) -> dict:
+        """
+        Returns request counters for a page handed out by `page()`:
+        requests_blocked, blocked_by_type, requests_allowed and declared_bytes
+        (the Content-Length of the responses received).
+        """
+        return self._page_stats.get(id(page), {})
+
+    async def _track_page(self, page):
+        stats = {"requests_blocked": 0, "blocked_by_type": {}, "requests_allowed": 0, "declared_bytes": 0}
+        self._page_stats[id(page)] = stats
+
+        # Sums the Content-Length of responses; chunked responses without one aren't counted.
+        def on_response(response):
+            try:
+                stats["declared_bytes"] += int(response.headers.get("content-length", 0))
+            except ValueError:
+                pass
+        page.on("response", on_response)
+
+        if not self.block_resources:
+            return
+
+        async def handle_route(route):
+            request = route.request
+            page_host = urlparse(page.url).hostname or ""
+            host = urlparse(request.url).hostname or ""
+            if request.resource_type in self.blocked_resource_types or is_blocked_host(host, page_host):
+                stats["requests_blocked"] += 1
+                by_type = stats["blocked_by_type"]
+                by_type[request.resource_type] = by_type.get(request.resource_type, 0) + 1
+                await route.abort()
+            else:
+                stats["requests_allowed"] += 1
+                await route.continue_()
+        await page.route("**/*", handle_route)
+
+    async def _acquire_context(self, slot: dict):
+        async with slot["lock"]:
+            browser = slot["browser"]
+            over_memory = self._memory_exceeded()
+            if browser is None or not browser.is_connected() or slot["pages"] >= self.pages_per_browser or over_memory:
+                if browser is not None:
+                    if over_memory:
+                        print("Browser memory above limit, restarting Chromium...")
+                        # The old browser's memory is only freed once its scrapes finish.
+                        self._rss_exceeded = False
+                        self._rss_checked_at = time.monotonic()
+                    await self._retire_browser(slot, browser)
+                slot["browser"] = await self._playwright.chromium.launch()
+                slot["pages"] = 0
+                self.stats["browsers_launched"] += 1
+            context = await slot["browser"].new_context()
+            slot["pages"] += 1
+            self.stats["contexts_created"] += 1
+            return context
+
+    async def _release_context(self, slot: dict, context):
+        async with slot["lock"]:
+            self.stats["pages_served"] += 1
+            browser = context.browser
+            try:
+                await context.close()
+            except Exception:
+                pass
+            if browser in slot["retired"] and not browser.contexts:
+                slot["retired"].remove(browser)
+                await self._close_quietly(browser)
+
+    async def _retire_browser(self, slot: dict, browser):
+        # Closes the browser now if it's idle, otherwise once its last context is released.
+        self.stats["browsers_recycled"] += 1
+        if browser.is_connected() and browser.contexts:
+            slot["retired"].append(browser)
+        else:
+            await self._close_quietly(browser)
+
+    async def _close_browser(self, slot: dict):
+        for browser in slot["retired"] + [slot["browser"]]:
+            if browser:
+                await self._close_quietly(browser)
+        slot["retired"] = []
+        slot["browser"] = None
+
+    async def _close_quietly(self, browser):
+        try:
+            await browser.close()
+        except Exception:
+            pass
+
+    def _memory_exceeded(self) -> bool:
+        # Sampling the process tree is not free, so only re-check every few seconds.
+        if not self.max_rss_mb or self.max_rss_mb <= 0:
+            return False
+        now = time.monotonic()
+        if now - self._rss_checked_at >= 5:
+            self._rss_checked_at = now
+            self._rss_exceeded = browser_rss_mb() > self.max_rss_mb
+        return self._rss_exceeded
+
+
+async def wait_for_text_stable(page, timeout_ms: int, quiet_ms: int = 500, poll_ms: int = 100) -> bool:
+    """
+    Waits until the page's visible text has stopped changing for `quiet_ms`, or until
+    `timeout_ms` has passed. Unlike "networkidle", this does not wait for trackers and
+    long-polling requests that never finish. Returns True if the text settled.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_ms / 1000
+    last_length, unchanged_since = None, loop.time()
+    while loop.time() < deadline:
+        length = await page.evaluate("() => document.body ? document.body.innerText.length : 0")
+        now = loop.time()
+        if length != last_length or not length:
+            last_length, unchanged_since = length, now
+        elif (now - unchanged_since) * 1000 >= quiet_ms:
+            return True
+        await asyncio.sleep(poll_ms / 1000)
+    return False
+
+
+def browser_processes() -> list:
+    """
+    Returns the Chromium processes started by this Python process.
+    """
+    processes = []
+    for child in psutil.Process().children(recursive=True):
+        try:
+            name = child.name().lower()
+        except psutil.Error:
+            continue
+        if "chrom" in name or "headless_shell" in name:
+            processes.append(child)
+    return processes
+
+
+def browser_rss_mb() -> float:
+    """
+    Returns the combined resident memory of all Chromium processes in megabytes.
+    """
+    total = 0
+    for process in browser_processes():
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024 * 1024)
@@ -0,0 +1,186 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+
+class DiskCache:
+    """
+    A small on-disk cache of JSON values, one gzip-compressed file per key.
+    Entries older than `ttl_seconds` are reported as stale but kept on disk so callers
+    can revalidate them (e.g. with an HTTP conditional request) instead of starting over.
+    With `max_bytes` set, the least recently used entries are evicted once the cache
+    grows past that size. A file's modification time records when it was last used.
+    """
+
+    def __init__(self, directory: str, ttl_seconds: float = None, max_bytes: int = None):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._size = None
+        self._size_lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "stores": 0, "evictions": 0}
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.json.gz")
+
+    def get_entry(self, key: str) -> dict:
+        """
+        Returns the stored entry {"key", "stored_at", "value"} whether or not it is fresh,
+        or None if nothing is stored for the key.
+        """
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("key") != key:
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        if self.ttl_seconds is None:
+            return True
+        return time.time() - entry.get("stored_at", 0) < self.ttl_seconds
+
+    def get(self, key: str):
+        """
+        Returns the cached value if it is present and fresh, otherwise None.
+        """
+        entry = self.get_entry(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        if not self.is_fresh(entry):
+            self.stats["stale"] += 1
+            return None
+        self.stats["hits"] += 1
+        if self.max_bytes:
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                pass
+        return entry["value"]
+
+    def set(self, key: str, value):
+        """
+        Stores a JSON-serializable value.
+        """
+        self._write(key, value)
+        self.stats["stores"] += 1
+
+    def touch(self, key: str):
+        """
+        Marks an existing entry as fresh again without changing its value.
+        """
+        entry = self.get_entry(key)
+        if entry is not None:
+            self._write(key, entry["value"])
+
+    def _write(self, key: str, value):
+        # Write to a temporary file and rename so readers never see a partial entry.
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(temp_path, "wt", encoding="utf-8") as f:
+            json.dump({"key": key, "stored_at": time.time(), "value": value}, f)
+        if not self.max_bytes:
+            os.replace(temp_path, path)
+            return
+        with self._size_lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._files())
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temp_path, path)
+            self._size += os.path.getsize(path) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _files(self) -> list:
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(".json.gz"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict(self):
+        # Drop least recently used entries until the cache is back under 90% of its limit.
+        target = self.max_bytes * 0.9
+        for _, size, path in sorted(self._files()):
+            if self._size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            self._size -= size
+            self.stats["evictions"] += 1
+
+
+class SingleFlightCache:
+    """
+    Memoizes a slow lookup (e.g. a Google scrape) in a DiskCache, and collapses concurrent
+    lookups of the same key into one call: later callers wait for the first one's result.
+    Found and empty results are kept for `ttl_seconds` and `negative_ttl_seconds`
+    respectively. Exceptions are passed to every waiting caller but never cached.
+    Meant for worker threads; callers block while the first lookup runs.
+    """
+
+    def __init__(self, cache: DiskCache, ttl_seconds: float, negative_ttl_seconds: float):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.stats = {"hits": 0, "negative_hits": 0, "misses": 0, "collapsed": 0}
+
+    def get_or_compute(self, key: str, compute, mode: str = "on"):
+        """
+        Returns the cached value for `key`, or compute()'s result, stored for next time.
+        `mode` follows CACHE_MODE: "on", "refresh" (don't read) or "off" (don't read or write).
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+        if not leader:
+            self.stats["collapsed"] += 1
+            return future.result()
+        try:
+            value = self._lookup(key, compute, mode)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def _lookup(self, key: str, compute, mode: str):
+        if mode == "on":
+            entry = self.cache.get_entry(key)
+            if entry is not None:
+                negative = not entry["value"]
+                ttl = self.negative_ttl_seconds if negative else self.ttl_seconds
+                if time.time() - entry.get("stored_at", 0) < ttl:
+                    self.stats["negative_hits" if negative else "hits"] += 1
+                    return entry["value"]
+        self.stats["misses"] += 1
+        value = compute()
+        if mode != "off":
+            self.cache.set(key, value)
+        return value
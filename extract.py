@@ -0,0 +1,189 @@
+import hashlib
+import re
+
+from bs4 import BeautifulSoup
+
+# Rough size of a Gemini token, used to turn a token budget into characters.
+CHARS_PER_TOKEN = 4
+
+# Tags that never hold page copy, and page furniture that repeats on every page.
+STRIP_TAGS = ["script", "style", "noscript", "template", "svg", "canvas", "iframe", "head", "form", "button", "select", "dialog", "nav", "footer", "aside"]
+STRIP_ROLES = {"navigation", "contentinfo", "dialog", "alertdialog", "menu", "menubar", "search"}
+BOILERPLATE_PATTERN = re.compile(
+    r"(?:^|[-_ ])(?:nav|navbar|navigation|menu|footer|cookies?|consent|gdpr|newsletter|subscribe|modal|popup|"
+    r"breadcrumbs?|skip|share|sharing|social|sidebar|announcement|topbar|login|signup|chat-widget)(?:[-_ ]|$)",
+    re.IGNORECASE,
+)
+# h1/h2 start a new section; lower headings (plan names, FAQ questions) stay in it as lines.
+SECTION_HEADINGS = ["h1", "h2"]
+HEADING_MARK = "\x1e"
+
+# Short calls to action that carry no information for the model.
+CTA_PATTERN = re.compile(
+    r"^(?:sign ?up|sign ?in|log ?in|get started|start (?:for )?free|try (?:it )?(?:for )?free|learn more|read more|"
+    r"see more|book a demo|request a demo|get a demo|watch (?:the )?demo|download|join now|subscribe|buy now|"
+    r"accept(?: all)?(?: cookies)?|reject all|close|menu|skip to (?:main )?content|back to top)[.!]?$",
+    re.IGNORECASE,
+)
+
+# Section kinds, the words that identify them, and how much each is worth to the prompts.
+SECTION_KINDS = [
+    ("pricing", re.compile(r"pric|plans?\b|billing|per month|/mo\b|/month|per user|free trial|enterprise|[$€£]\s?\d", re.IGNORECASE), 3.0),
+    ("features", re.compile(r"feature|capabilit|what you can|how it works|integrat|use cases?|benefit|why\b", re.IGNORECASE), 2.5),
+    ("faq", re.compile(r"\bfaqs?\b|frequently asked|questions|\?$", re.IGNORECASE), 2.0),
+    ("overview", re.compile(r"about|overview|what is|introduc|meet\b|mission", re.IGNORECASE), 1.5),
+]
+
+# The sections a post is written from; changes elsewhere on a site (news, testimonials,
+# customer counts) don't make the post out of date.
+CONTENT_HASH_KINDS = {"pricing", "features"}
+
+
+def _is_boilerplate(tag) -> bool:
+    if tag.get("aria-hidden") == "true" or tag.has_attr("hidden"):
+        return True
+    if (tag.get("role") or "").lower() in STRIP_ROLES:
+        return True
+    style = (tag.get("style") or "").replace(" ", "").lower()
+    if "display:none" in style or "visibility:hidden" in style:
+        return True
+    names = " ".join(tag.get("class") or []) + " " + (tag.get("id") or "")
+    return bool(BOILERPLATE_PATTERN.search(names))
+
+
+def _clean_line(line: str) -> str:
+    return re.sub(r"\s+", " ", line).strip()
+
+
+def _classify(title: str, lines: list[str], page_title: str) -> tuple[str, float]:
+    # The heading decides the kind when it can, then the body's first lines, then the
+    # h1 the section sits under (e.g. plan cards on a page titled "Pricing").
+    for kind, pattern, weight in SECTION_KINDS:
+        if pattern.search(title):
+            return kind, weight
+    body = " ".join(lines[:6])
+    for kind, pattern, weight in SECTION_KINDS:
+        if len(pattern.findall(body)) >= 2:
+            return kind, weight * 0.8
+    for kind, pattern, weight in SECTION_KINDS:
+        if page_title and pattern.search(page_title):
+            return kind, weight * 0.8
+    return "other", 1.0
+
+
+def _build_sections(blocks: list[tuple[str, str, list[str]]]) -> list[dict]:
+    sections = []
+    seen = set()
+    for title, page_title, lines in blocks:
+        kept = []
+        for line in lines:
+            key = line.lower()
+            if key in seen or CTA_PATTERN.match(line):
+                continue
+            # Single characters and bare symbols are layout leftovers, but short prices stay.
+            if len(line) < 3 and not re.search(r"\d", line):
+                continue
+            seen.add(key)
+            kept.append(line)
+        if not kept:
+            continue
+        kind, weight = _classify(title, kept, page_title)
+        order = len(sections)
+        # Dense sections (real sentences) beat lists of one-word links, except for pricing,
+        # where short lines are the prices themselves. The intro gets a bonus.
+        average_line = sum(len(line) for line in kept) / len(kept)
+        density = 1.0 if kind == "pricing" else min(average_line, 120) / 120
+        score = weight * (1 + density) + (0.75 if order == 0 else 0)
+        sections.append({"title": title, "kind": kind, "lines": kept, "score": round(score, 3), "order": order})
+    return sections
+
+
+def extract_sections(html_content: str, fallback_text: str = "") -> list[dict]:
+    """
+    Splits a scraped page into ranked sections of readable text.
+    Navigation, footers, cookie banners, modals and other boilerplate are removed, repeated
+    lines and bare calls to action are dropped, and each heading's section is labelled as
+    pricing, features, faq, overview or other with a score for pack_sections().
+    Falls back to `fallback_text` (e.g. the browser's inner_text) when the HTML has no text.
+    """
+    blocks = []
+    if html_content:
+        soup = BeautifulSoup(html_content, "html.parser")
+        for tag in soup(STRIP_TAGS):
+            tag.decompose()
+        for tag in soup.find_all(True):
+            if not tag.decomposed and tag.name not in ("html", "body", "main") and _is_boilerplate(tag):
+                tag.decompose()
+        for heading in soup.find_all(SECTION_HEADINGS):
+            heading.replace_with(f"\n{HEADING_MARK}{heading.name}{_clean_line(heading.get_text(' '))}\n")
+        title, page_title, lines = "", "", []
+        for raw_line in soup.get_text("\n").split("\n"):
+            if raw_line.startswith(HEADING_MARK):
+                blocks.append((title, page_title, lines))
+                title, lines = _clean_line(raw_line[3:]), []
+                if raw_line[1:3] == "h1":
+                    page_title = title
+                continue
+            line = _clean_line(raw_line)
+            if line:
+                lines.append(line)
+        blocks.append((title, page_title, lines))
+    sections = _build_sections(blocks)
+    if sum(len(line) for section in sections for line in section["lines"]) < 200 and fallback_text:
+        sections = _build_sections([("", "", [_clean_line(line) for line in fallback_text.splitlines() if line.strip()])])
+    return sections
+
+
+def pack_sections(sections: list[dict], budget_tokens: int) -> str:
+    """
+    Fits the highest-scoring sections into `budget_tokens` and returns them in page order,
+    each under a "## <heading>" label. A section that does not fit whole is cut at a line.
+    """
+    budget = budget_tokens * CHARS_PER_TOKEN
+    chosen = {}
+    for section in sorted(sections, key=lambda s: (-s["score"], s["order"])):
+        label = f"## {section['title']}\n" if section["title"] else ""
+        if budget <= len(label) + 40:
+            continue
+        lines = []
+        used = len(label)
+        for line in section["lines"]:
+            if used + len(line) + 1 > budget:
+                break
+            lines.append(line)
+            used += len(line) + 1
+        if lines:
+            chosen[section["order"]] = label + "\n".join(lines)
+            budget -= used + 1
+    return "\n\n".join(chosen[order] for order in sorted(chosen))
+
+
+def extract_page_sections(pages: list[dict]) -> list[dict]:
+    """
+    extract_sections() for a site scraped page by page (see --multi_page). Each section's
+    title is prefixed with the page it came from, e.g. "Pricing: Plans", and the sections
+    stay in page order. Lines already seen on an earlier page are dropped.
+    """
+    sections = []
+    seen = set()
+    for page in pages:
+        label = page["section"].title()
+        for section in extract_sections(page["html"], page["text"]):
+            lines = [line for line in section["lines"] if line.lower() not in seen]
+            if not lines:
+                continue
+            seen.update(line.lower() for line in lines)
+            title = f"{label}: {section['title']}" if section["title"] else label
+            sections.append(dict(section, title=title, lines=lines, order=len(sections)))
+    return sections
+
+
+def content_hash(sections: list[dict]) -> str:
+    """
+    Hashes the pricing and feature text of extracted sections, ignoring case, spacing and
+    line order, so a refresh can tell whether the material a post was written from changed.
+    Pages without pricing or feature sections are hashed whole.
+    """
+    chosen = [section for section in sections if section["kind"] in CONTENT_HASH_KINDS] or sections
+    lines = sorted({line.lower() for section in chosen for line in section["lines"]})
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
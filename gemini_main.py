@@ -1,38 +1,69 @@
 import time
 import os
+import sys
+import json
+import hashlib
+import io
 import asyncio
 import re
+import math
+import threading
+import httplib2
 import google.generativeai as genai
 from dotenv import load_dotenv
 import csv
-from playwright.async_api import async_playwright
 import argparse
-import requests
 from bs4 import BeautifulSoup
 from googleapiclient.discovery import build
-from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from rate_limit import HostRateLimiter, RateLimiter
+from browser_pool import BrowserPool, wait_for_text_stable
+import http_client
+from cache import DiskCache, SingleFlightCache
+from urls import canonical_tool_url, canonicalize_url
+from journal import Journal
+from quota import QuotaLedger
+from tool_index import ToolIndex, normalize_tool_name
+from job_queue import JobQueue, run_workers
+from metrics import Metrics, start_metrics_server
+from extract import content_hash, extract_page_sections, extract_sections, pack_sections
+from page_metadata import extract_metadata, image_candidates, manifest_icons, needs_manifest, same_site_links, section_links
+from image_probe import probe_image, rejection_reason, score_image
 
 # --- Main Application Logic ---
 
-def get_google_image(tool_name: str) -> str:
+def fetch_google_images(tool_name: str, limit: int) -> list[str]:
     print(f"Searching Google Images for '{tool_name} logo'...")
-    search_url = f"https://www.google.com/search?tbm=isch&q={tool_name.replace(' ', '+')}+logo"
+    search_url = f"{GOOGLE_SEARCH_URL}?tbm=isch&q={tool_name.replace(' ', '+')}+logo"
     headers = {"User-Agent": "Mozilla/5.0"}
+    GOOGLE_LIMITER.acquire_sync(search_url)
+    resp = http_client.get(search_url, headers=headers)
+    # A throttled or failed search must not be cached as "no images".
+    resp.raise_for_status()
+    soup = BeautifulSoup(resp.text, "html.parser")
+    # Collect img tags with a direct http/https src
+    found = []
+    for img_tag in soup.find_all("img"):
+        # Some images may use data-src for lazy loading
+        src = img_tag.get("src") if (img_tag.get("src") or "").startswith("http") else img_tag.get("data-src")
+        if src and src.startswith("http") and src not in found:
+            found.append(src)
+            if len(found) >= limit:
+                break
+    return found
+
+
+def get_google_images(tool_name: str, limit: int = 5) -> list[str]:
+    """
+    Returns the first few image URLs from a Google Images search for the tool's logo.
+    Lookups are cached and shared between concurrent callers (see GOOGLE_CACHE).
+    """
     try:
-        resp = requests.get(search_url, headers=headers)
-        soup = BeautifulSoup(resp.text, "html.parser")
-        # Find all img tags and return the first with a direct http/https src
-        for img_tag in soup.find_all("img"):
-            src = img_tag.get("src")
-            if src and src.startswith("http"):
-                return src
-            # Some images may use data-src for lazy loading
-            data_src = img_tag.get("data-src")
-            if data_src and data_src.startswith("http"):
-                return data_src
+        return GOOGLE_CACHE.get_or_compute(f"images|{limit}|{normalize_tool_name(tool_name)}", lambda: fetch_google_images(tool_name, limit), CACHE_MODE)
     except Exception as e:
         print(f"Error fetching Google image: {e}")
-    return ""
+        METRICS.record_error("google_image_fallback")
+    return []
 
 
 # Load environment variables from .env file
@@ -41,8 +72,139 @@ load_dotenv()
 # --- Configuration ---
 CSV_OUTPUT_DIR = "output_csv"
 HTML_OUTPUT_DIR = "output_html_gemini"
+CSV_HEADERS = [
+    "Title","Author","Excerpt","Thumbnail","Language","Genres","Tags","Portrait Image","Movie Method","Movie URL","Content","Status"
+]
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+# Alternative service endpoints, e.g. the local stand-ins started by bench/run_bench.py.
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+YOUTUBE_API_ENDPOINT = os.getenv("YOUTUBE_API_ENDPOINT")
+GOOGLE_SEARCH_URL = os.getenv("GOOGLE_SEARCH_URL", "https://www.google.com/search")
+
+# --- Batch Scheduling ---
+# Requests per minute allowed for each external service. Override with env vars or CLI flags.
+DEFAULT_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+GEMINI_LIMITER = RateLimiter(float(os.getenv("GEMINI_RPM", "60")))
+YOUTUBE_LIMITER = RateLimiter(float(os.getenv("YOUTUBE_RPM", "30")))
+# Google is limited per host, with a small burst so a tool's two searches can go out together.
+GOOGLE_LIMITER = HostRateLimiter(float(os.getenv("GOOGLE_RPM", "10")), burst=int(os.getenv("GOOGLE_BURST", "2")))
+
+# --- Browser Pool ---
+# Chromium processes are started once and shared by every scrape in the run.
+BROWSER_POOL = BrowserPool(
+    browsers=int(os.getenv("BROWSER_POOL_SIZE", "1")),
+    max_pages=int(os.getenv("BROWSER_MAX_PAGES", "4")),
+    pages_per_browser=int(os.getenv("BROWSER_RESTART_PAGES", "200")),
+    max_rss_mb=int(os.getenv("BROWSER_MAX_RSS_MB", "1500")),
+    block_resources=os.getenv("SCRAPE_BLOCK_RESOURCES", "1") != "0",
+)
+# How long to wait for the network to go quiet after opening the pricing page.
+# Sites with trackers may never go idle, so the scrape continues with what has loaded.
+NETWORK_IDLE_TIMEOUT_MS = int(os.getenv("NETWORK_IDLE_TIMEOUT_MS", "5000"))
+
+# --- Multi-Page Scraping ---
+# With --multi_page (or MULTI_PAGE_SCRAPE=1), the pricing, docs and about pages linked from
+# the home page are loaded in parallel and kept next to it, instead of the pricing page
+# replacing the home page. At most SCRAPE_PAGE_BUDGET extra pages are read per tool, and
+# pages not ready SCRAPE_DEADLINE_SECONDS after the scrape started are left out.
+MULTI_PAGE_SCRAPE = os.getenv("MULTI_PAGE_SCRAPE", "0") == "1"
+SCRAPE_PAGE_BUDGET = int(os.getenv("SCRAPE_PAGE_BUDGET", "3"))
+SCRAPE_DEADLINE_SECONDS = float(os.getenv("SCRAPE_DEADLINE_SECONDS", "20"))
+# A browser page is ready once its DOM has loaded and its text has not changed for this long.
+TEXT_STABLE_MS = int(os.getenv("TEXT_STABLE_MS", "500"))
+
+# --- Streaming Previews ---
+# With --stream (or STREAM_PREVIEW=1) the post is streamed from Gemini and its HTML
+# preview is written as it arrives instead of after generation finishes.
+STREAM_PREVIEW = os.getenv("STREAM_PREVIEW", "0") == "1"
+PREVIEW_REFRESH_SECONDS = int(os.getenv("PREVIEW_REFRESH_SECONDS", "2"))
+PREVIEW_REFRESH_TAG = f'<meta http-equiv="refresh" content="{PREVIEW_REFRESH_SECONDS}">\n'
+
+# --- Prompt Size ---
+# Token budgets for the page text sent to Gemini. The text is condensed by extract.py, so
+# pricing, features and FAQ sections are kept ahead of menus, footers and banners.
+GENRE_PROMPT_TOKENS = int(os.getenv("GENRE_PROMPT_TOKENS", "800"))
+GENERATION_PROMPT_TOKENS = int(os.getenv("GENERATION_PROMPT_TOKENS", "2000"))
+
+# --- Genre Batching ---
+# With --batch_genres, a --tools_file run classifies many tools per Gemini call. A batch is
+# sent once GENRE_BATCH_SIZE tools are waiting or the oldest has waited GENRE_BATCH_MAX_WAIT
+# seconds; tools whose answer fails validation go into a later batch, up to GENRE_BATCH_ATTEMPTS.
+GENRE_BATCH_SIZE = int(os.getenv("GENRE_BATCH_SIZE", "25"))
+GENRE_BATCH_MAX_WAIT = float(os.getenv("GENRE_BATCH_MAX_WAIT", "30"))
+GENRE_BATCH_ATTEMPTS = int(os.getenv("GENRE_BATCH_ATTEMPTS", "2"))
+GENRE_BATCH_TOOL_TOKENS = int(os.getenv("GENRE_BATCH_TOOL_TOKENS", "300"))
+
+# --- Image Selection ---
+# Image candidates are checked concurrently by downloading only their first bytes.
+# Broken, tiny (shorter side under IMAGE_MIN_SIDE px), SVG and icon-file images are rejected.
+IMAGE_MIN_SIDE = int(os.getenv("IMAGE_MIN_SIDE", "150"))
+IMAGE_PROBE_BYTES = int(os.getenv("IMAGE_PROBE_BYTES", "65536"))
+IMAGE_MAX_CANDIDATES = int(os.getenv("IMAGE_MAX_CANDIDATES", "8"))
+
+# --- Metrics ---
+# Timing, error and in-flight counts for every pipeline stage (see metrics.py).
+METRICS = Metrics()
+
+# --- Tiered Fetching ---
+# Try a plain HTTP fetch first and only open Chromium when the page needs JavaScript.
+STATIC_FETCH = os.getenv("STATIC_FETCH", "1") != "0"
+STATIC_MIN_TEXT_CHARS = int(os.getenv("STATIC_MIN_TEXT_CHARS", "500"))
+SCRAPE_STATS = {"static": 0, "browser": 0, "failed": 0, "revalidated": 0}
+
+# --- Caching ---
+# "on" reads and writes the caches, "refresh" ignores cached entries but stores new ones,
+# "off" bypasses the caches entirely.
+CACHE_MODE = os.getenv("CACHE_MODE", "on")
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+SCRAPE_CACHE = DiskCache(
+    os.path.join(CACHE_DIR, "scrape"),
+    ttl_seconds=float(os.getenv("SCRAPE_CACHE_TTL_HOURS", "72")) * 3600,
+)
+# Gemini responses are keyed by model, prompt and settings, so they never go stale;
+# the oldest unused responses are evicted once the cache passes its size limit.
+GEMINI_CACHE_ENABLED = os.getenv("GEMINI_CACHE", "1") != "0"
+GEMINI_CACHE = DiskCache(
+    os.path.join(CACHE_DIR, "gemini"),
+    max_bytes=int(os.getenv("GEMINI_CACHE_MAX_MB", "200")) * 1024 * 1024,
+)
+# Google trending questions and image searches by tool name. Empty answers are kept for a
+# shorter time than found ones, and concurrent lookups for the same tool share one request.
+GOOGLE_CACHE = SingleFlightCache(
+    DiskCache(os.path.join(CACHE_DIR, "google")),
+    ttl_seconds=float(os.getenv("GOOGLE_CACHE_TTL_HOURS", "72")) * 3600,
+    negative_ttl_seconds=float(os.getenv("GOOGLE_NEGATIVE_TTL_HOURS", "6")) * 3600,
+)
+# YouTube search results by normalized tool name.
+YOUTUBE_CACHE = DiskCache(
+    os.path.join(CACHE_DIR, "youtube"),
+    ttl_seconds=float(os.getenv("YOUTUBE_CACHE_TTL_HOURS", "168")) * 3600,
+)
+# Probed image formats and sizes, so an image URL is only downloaded once.
+IMAGE_CACHE = DiskCache(
+    os.path.join(CACHE_DIR, "images"),
+    ttl_seconds=float(os.getenv("IMAGE_CACHE_TTL_HOURS", "168")) * 3600,
+)
+
+# --- YouTube ---
+# A search costs 100 units of the API's daily quota (10,000 by default) and a videos().list
+# call 1 unit. Spending is recorded in .cache/youtube_quota-<day>.jsonl; once fewer than
+# YOUTUBE_QUOTA_RESERVE units would be left for the day, lookups only use cached results.
+YOUTUBE_QUOTA = QuotaLedger(
+    os.path.join(CACHE_DIR, "youtube_quota.jsonl"),
+    daily_units=int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000")),
+    reserve=int(os.getenv("YOUTUBE_QUOTA_RESERVE", "500")),
+)
+YOUTUBE_SEARCH_UNITS = 100
+YOUTUBE_VIDEOS_UNITS = 1
+# Rank the search results by title, views and length with one videos().list call.
+YOUTUBE_RANK_RESULTS = os.getenv("YOUTUBE_RANK_RESULTS", "1") != "0"
+YOUTUBE_STATS = {"searches": 0, "cache_only": 0}
+_youtube_client = None
+_youtube_lock = threading.Lock()
+_youtube_http = threading.local()
 
 genres = [
     "AI Workflow", "AI Recruiting", "AI Customer Service", "Personal AI Assistant",
@@ -213,165 +375,688 @@ PLAN_TEMPLATE = r'''
     AIC is not responsible for the performance, safety, outcomes, or risks associated with any listed tools. Some links on this site may be affiliate links, meaning we may earn a commission if you click and make a purchase, at no additional cost to you. Always research thoroughly, comply with local laws and regulations, and consult qualified financial or legal professionals before taking action to understand potential risks. Nothing herein constitutes professional advice, and all decisions are at the user’s sole discretion. This disclaimer is governed by the laws of St. Petersburg, Florida, USA.
 '''
 
+# --- Job Queue ---
+# Durable queue shared by the webhook server, `--tools_file --enqueue` and `worker` processes.
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", "jobs.sqlite3")
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "600"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+# --- Tool Index ---
+# Every tool with a post, by canonical URL and name. Batches and submissions skip tools
+# found here (reusing their rows) unless --reprocess is given.
+TOOL_INDEX = ToolIndex(os.getenv("TOOL_INDEX_PATH", os.path.join(CSV_OUTPUT_DIR, "tool_index.jsonl")))
+SKIP_KNOWN_TOOLS = True
+
 # --- Main Application Logic ---
 
-async def scrape_website(url: str) -> tuple[str, str]:
+async def scrape_website(url: str) -> tuple[str, str, dict]:
     """
     Asynchronously scrapes the text and HTML content of a given URL.
-    Returns a tuple of (text_content, html_content).
+    Returns a tuple of (text_content, html_content, metadata), where metadata is read
+    from the home page before any pricing page is opened (see page_metadata.py).
     """
     print(f"Scraping {url}...")
     if not url.startswith('http'):
         url = 'https://' + url
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch()
-            page = await browser.new_page()
+        async with BROWSER_POOL.page() as page:
             await page.goto(url, timeout=60000)
+            metadata = await asyncio.to_thread(extract_metadata, await page.content(), page.url)
             
             # Look for a pricing link and click it
             try:
                 pricing_link = page.get_by_role("link", name=re.compile(r"pricing|plans", re.IGNORECASE)).first
                 if await pricing_link.is_visible():
                     print("Found pricing/plans link, navigating...")
-                    await pricing_link.click()
-                    await page.wait_for_load_state("networkidle", timeout=30000)
+                    with METRICS.span("pricing_navigation"):
+                        await pricing_link.click()
+                        await page.wait_for_load_state("domcontentloaded", timeout=30000)
+                        try:
+                            await page.wait_for_load_state("networkidle", timeout=NETWORK_IDLE_TIMEOUT_MS)
+                        except Exception:
+                            print("Network did not go idle, continuing with the loaded page.")
             except Exception as e:
                 print(f"No pricing/plans link found or error navigating: {e}")
 
             text_content = await page.locator('body').inner_text()
             html_content = await page.content()
-            await browser.close()
-            print("Scraping complete.")
-            return text_content, html_content
+            stats = BROWSER_POOL.page_stats(page)
+            if stats.get("requests_blocked"):
+                print(f"Blocked {stats['requests_blocked']} requests {stats['blocked_by_type']}, received {stats['declared_bytes'] / 1024:.0f} KB by Content-Length.")
+        print("Scraping complete.")
+        return text_content, html_content, metadata
     except Exception as e:
         print(f"Error scraping website: {e}")
-        return "", ""
+        return "", "", {}
 
-def find_image_url(html_content: str, base_url: str) -> str:
+async def load_page_text(page, url: str, timeout_seconds: float) -> dict:
     """
-    Parses HTML to find the best representative image URL.
+    Opens `url` and waits until the DOM has loaded and the text is stable, rather than
+    for the network to go idle. Returns {"url", "text", "html"}.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_seconds
+    await page.goto(url, wait_until="domcontentloaded", timeout=timeout_seconds * 1000)
+    await wait_for_text_stable(page, max(0, deadline - loop.time()) * 1000, quiet_ms=TEXT_STABLE_MS)
+    return {"url": page.url, "text": await page.locator('body').inner_text(), "html": await page.content()}
+
+
+def merge_page_text(pages: list[dict]) -> str:
+    """
+    Joins the text of a multi-page scrape, each page under a "## <Section> page" label.
+    """
+    return "\n\n".join(f"## {page['section'].title()} page\n{page['text'].strip()}" for page in pages if page["text"].strip())
+
+
+async def scrape_site_pages(url: str) -> dict:
+    """
+    Multi-page browser scrape (--multi_page): loads the home page, then opens its pricing,
+    docs and about links in parallel pages of the same browser context.
+    Returns a dict with the merged "text", the home page's "html" and "metadata", and
+    "pages" ({"section", "url", "text", "html"} for each page read). "text" is empty on failure.
+    """
+    print(f"Scraping {url} and its linked pages...")
+    if not url.startswith('http'):
+        url = 'https://' + url
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SCRAPE_DEADLINE_SECONDS
+    try:
+        async with BROWSER_POOL.page() as page:
+            home = await load_page_text(page, url, max(SCRAPE_DEADLINE_SECONDS, 60))
+            metadata = await asyncio.to_thread(extract_metadata, home["html"], home["url"])
+            links = section_links(metadata, home["url"], SCRAPE_PAGE_BUDGET) if deadline > loop.time() else []
+
+            async def load_section(section, link):
+                async with BROWSER_POOL.sibling_page(page) as sibling:
+                    return dict(await load_page_text(sibling, link, deadline - loop.time()), section=section)
+
+            pages = [dict(home, section="home")]
+            if links:
+                print(f"Loading {', '.join(section for section, _ in links)} pages in parallel...")
+                with METRICS.span("section_pages"):
+                    tasks = [asyncio.ensure_future(load_section(section, link)) for section, link in links]
+                    _, pending = await asyncio.wait(tasks, timeout=max(0, deadline - loop.time()))
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+                for (section, link), task in zip(links, tasks):
+                    if task in pending:
+                        print(f"Skipped the {section} page, it was not ready before the deadline.")
+                    elif task.exception():
+                        print(f"Could not load the {section} page {link}: {task.exception()}")
+                    elif task.result()["text"].strip():
+                        pages.append(task.result())
+            stats = BROWSER_POOL.page_stats(page)
+            if stats.get("requests_blocked"):
+                print(f"Blocked {stats['requests_blocked']} requests {stats['blocked_by_type']}, received {stats['declared_bytes'] / 1024:.0f} KB by Content-Length.")
+        print(f"Scraping complete ({len(pages)} pages).")
+        return {"text": merge_page_text(pages), "html": home["html"], "metadata": metadata, "pages": pages}
+    except Exception as e:
+        print(f"Error scraping website: {e}")
+        return {"text": "", "html": "", "metadata": {}, "pages": []}
+
+
+def extract_visible_text(html_content: str) -> str:
+    """
+    Returns the readable text of an HTML document, similar to the browser's body.inner_text().
     """
-    if not html_content:
-        return ""
-    print("Finding best image URL...")
     soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Prioritize Open Graph image
-    og_image = soup.find('meta', property='og:image')
-    if og_image and og_image.get('content'):
-        return urljoin(base_url, og_image['content'])
-
-    # Look for a logo
-    logo = soup.find('img', alt=lambda x: x and 'logo' in x.lower())
-    if logo and logo.get('src'):
-        return urljoin(base_url, logo['src'])
-
-    # Fallback to the first large image
-    for img in soup.find_all('img'):
-        if img.get('width') and img.get('height'):
-            try:
-                if int(img['width']) > 100 and int(img['height']) > 100:
-                    return urljoin(base_url, img['src'])
-            except (ValueError, TypeError):
-                continue
-    
-    print("No suitable image found.")
-    return ""
+    for tag in soup(["script", "style", "noscript", "template", "svg", "head"]):
+        tag.decompose()
+    return soup.get_text("\n", strip=True)
+
+
+def looks_like_complete_page(html_content: str, text_content: str) -> bool:
+    """
+    Heuristic for whether a static HTML response already holds the page's content,
+    or is a JavaScript shell / bot challenge that needs a real browser.
+    """
+    if len(text_content) < STATIC_MIN_TEXT_CHARS:
+        return False
+    lowered = text_content[:2000].lower()
+    shell_markers = [
+        "enable javascript", "javascript is required", "javascript is disabled",
+        "checking your browser", "just a moment...", "verify you are human",
+    ]
+    if len(text_content) < 1500 and any(marker in lowered for marker in shell_markers):
+        return False
+    # Single-page apps render into an empty mount point.
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for mount_id in ["root", "__next", "app", "__nuxt", "svelte"]:
+        mount = soup.find(id=mount_id)
+        if mount is not None and not mount.get_text(strip=True):
+            return False
+    return True
+
+
+def response_validators(response) -> dict:
+    """
+    Returns the URL and cache validators (ETag / Last-Modified) of an HTTP response.
+    """
+    return {
+        "url": str(response.url),
+        "etag": response.headers.get("ETag", ""),
+        "last_modified": response.headers.get("Last-Modified", ""),
+    }
+
+
+def get_page(url: str, prefetched: dict = None):
+    # A page that answered revalidate_pages() with 200 is already downloaded.
+    response = prefetched.pop(url, None) if prefetched else None
+    return response if response is not None else http_client.get(url)
+
+
+def fetch_static(url: str, prefetched: dict = None) -> dict:
+    """
+    Fetches a page (and its pricing page, if linked) over plain HTTP.
+    `prefetched` maps URLs to responses already downloaded (see revalidate_pages).
+    Returns a dict with "text", "html", the home page's "metadata" and "validators" for
+    each fetched page. "text" is empty when the page needs a browser.
+    With --multi_page, the pricing, docs and about pages are fetched in parallel and kept
+    with the home page in "pages" (see scrape_site_pages).
+    """
+    failed = {"text": "", "html": "", "metadata": {}, "validators": [], "pages": []}
+    started = time.monotonic()
+    if not url.startswith('http'):
+        url = 'https://' + url
+    try:
+        response = get_page(url, prefetched)
+        if response.status_code != 200 or "html" not in response.headers.get("content-type", "html"):
+            return failed
+        html_content = response.text
+        text_content = extract_visible_text(html_content)
+        if not looks_like_complete_page(html_content, text_content):
+            return failed
+        validators = [response_validators(response)]
+        metadata = extract_metadata(html_content, str(response.url))
+        if MULTI_PAGE_SCRAPE:
+            pages = [{"section": "home", "url": str(response.url), "text": text_content, "html": html_content}]
+            links = section_links(metadata, str(response.url), SCRAPE_PAGE_BUDGET)
+            pages += fetch_static_sections(links, validators, started + SCRAPE_DEADLINE_SECONDS, prefetched)
+            return {"text": merge_page_text(pages), "html": html_content, "metadata": metadata, "validators": validators, "pages": pages}
+
+        pricing_links = same_site_links(metadata, "pricing", str(response.url))
+        pricing_url = pricing_links[0] if pricing_links else ""
+        if pricing_url and pricing_url.startswith('http'):
+            print("Found pricing/plans link, fetching...")
+            with METRICS.span("pricing_navigation"):
+                pricing_response = get_page(pricing_url, prefetched)
+            pricing_html = pricing_response.text if pricing_response.status_code == 200 else ""
+            pricing_text = extract_visible_text(pricing_html) if pricing_html else ""
+            if not looks_like_complete_page(pricing_html, pricing_text):
+                return failed
+            validators.append(response_validators(pricing_response))
+            return {"text": pricing_text, "html": pricing_html, "metadata": metadata, "validators": validators, "pages": []}
+        return {"text": text_content, "html": html_content, "metadata": metadata, "validators": validators, "pages": []}
+    except Exception as e:
+        print(f"Static fetch failed for {url}: {e}")
+        return failed
+
+
+def fetch_static_sections(links: list[tuple[str, str]], validators: list, deadline: float, prefetched: dict = None) -> list[dict]:
+    """
+    Fetches the (section, url) pages of a multi-page scrape in parallel over plain HTTP.
+    Pages that fail, need a browser or are not back by `deadline` (time.monotonic()) are
+    left out. Adds each kept page's validators to `validators`.
+    """
+    from concurrent.futures import wait
+
+    def fetch(link):
+        response = get_page(link, prefetched)
+        page_html = response.text if response.status_code == 200 else ""
+        page_text = extract_visible_text(page_html) if page_html else ""
+        return response, page_html, page_text
+
+    if not links:
+        return []
+    print(f"Fetching {', '.join(section for section, _ in links)} pages in parallel...")
+    executor = ThreadPoolExecutor(max_workers=len(links))
+    try:
+        with METRICS.span("section_pages"):
+            futures = [executor.submit(fetch, link) for _, link in links]
+            wait(futures, timeout=max(0, deadline - time.monotonic()))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    pages = []
+    for (section, link), future in zip(links, futures):
+        if not future.done():
+            print(f"Skipped the {section} page, it was not ready before the deadline.")
+            continue
+        try:
+            response, page_html, page_text = future.result()
+        except Exception as e:
+            print(f"Could not fetch the {section} page {link}: {e}")
+            continue
+        if looks_like_complete_page(page_html, page_text):
+            validators.append(response_validators(response))
+            pages.append({"section": section, "url": str(response.url), "text": page_text, "html": page_html})
+    return pages
+
+
+def revalidate_pages(validators: list[dict]) -> tuple[bool, dict]:
+    """
+    Sends conditional GETs for previously fetched pages.
+    Returns (True, {}) only if every page answered 304 Not Modified. Otherwise returns
+    False with {url: response} for a page that answered 200, so fetch_static() can use
+    that response instead of downloading the page again.
+    """
+    if not validators:
+        return False, {}
+    try:
+        for validator in validators:
+            headers = {}
+            if validator.get("etag"):
+                headers["If-None-Match"] = validator["etag"]
+            if validator.get("last_modified"):
+                headers["If-Modified-Since"] = validator["last_modified"]
+            if not headers:
+                return False, {}
+            response = http_client.get(validator["url"], headers=headers)
+            if response.status_code == 200:
+                return False, {validator["url"]: response}
+            if response.status_code != 304:
+                return False, {}
+        return True, {}
+    except Exception as e:
+        print(f"Revalidation failed: {e}")
+        return False, {}
+
+
+@METRICS.timed("scrape")
+async def fetch_tool_page(url: str, revalidate: bool = False) -> dict:
+    """
+    Tiered fetch: serves the page from the scrape cache when possible, then tries a plain
+    HTTP request, and falls back to headless Chromium when the static HTML looks like a
+    JavaScript shell.
+    With `revalidate`, a cached scrape is only reused once conditional requests show the
+    site is unchanged, however fresh the cache entry is.
+    Returns a dict with "text", "html", "metadata" (see page_metadata.py), "pages" (with
+    --multi_page), "tier" ("static", "browser" or "" on failure) and "from_cache".
+    """
+    # Single and multi-page scrapes of a site are cached separately.
+    cache_key = canonicalize_url(url) + ("#multi_page" if MULTI_PAGE_SCRAPE else "")
+    prefetched = {}
+    if CACHE_MODE == "on":
+        cached = None if revalidate else SCRAPE_CACHE.get(cache_key)
+        if cached:
+            print(f"Using cached scrape of {cache_key}.")
+            return cached_scrape(cached, url)
+        entry = SCRAPE_CACHE.get_entry(cache_key)
+        if entry:
+            unchanged, prefetched = await asyncio.to_thread(revalidate_pages, entry["value"].get("validators"))
+            if unchanged:
+                print(f"Site unchanged (304), reusing cached scrape of {cache_key}.")
+                SCRAPE_STATS["revalidated"] += 1
+                SCRAPE_CACHE.touch(cache_key)
+                return cached_scrape(entry["value"], url)
+
+    result = {"text": "", "html": "", "metadata": {}, "pages": [], "tier": "", "validators": []}
+    if STATIC_FETCH:
+        static = await asyncio.to_thread(fetch_static, url, prefetched)
+        if static["text"]:
+            print("Scraping complete (static HTML).")
+            result = dict(static, tier="static")
+        else:
+            print("Static HTML not sufficient, using the browser...")
+
+    if not result["text"]:
+        if MULTI_PAGE_SCRAPE:
+            scraped = await scrape_site_pages(url)
+        else:
+            text_content, html_content, metadata = await scrape_website(url)
+            scraped = {"text": text_content, "html": html_content, "metadata": metadata, "pages": []}
+        if scraped["text"]:
+            result = dict(scraped, tier="browser", validators=[])
+
+    if not result["text"]:
+        SCRAPE_STATS["failed"] += 1
+        METRICS.record_error("scrape")
+        return {"text": "", "html": "", "metadata": {}, "pages": [], "tier": "", "from_cache": False}
+    SCRAPE_STATS[result["tier"]] += 1
+    if CACHE_MODE != "off":
+        SCRAPE_CACHE.set(cache_key, result)
+    return {"text": result["text"], "html": result["html"], "metadata": result["metadata"], "pages": result["pages"], "tier": result["tier"], "from_cache": False}
+
+
+def cached_scrape(cached: dict, url: str) -> dict:
+    # Entries cached before page metadata was kept get it from their (possibly pricing page) HTML.
+    metadata = cached.get("metadata") or extract_metadata(cached["html"], url)
+    return {"text": cached["text"], "html": cached["html"], "metadata": metadata, "pages": cached.get("pages", []), "tier": cached["tier"], "from_cache": True}
+
+
+@METRICS.timed("image_discovery")
+def find_image_candidates(metadata: dict) -> list[str]:
+    """
+    Lists the page's image URLs from its metadata, best first (see image_candidates).
+    The web manifest is only fetched when the page has no better image.
+    """
+    if not metadata:
+        return []
+    print("Finding image candidates...")
+    if needs_manifest(metadata) and not metadata["manifest_icons"]:
+        try:
+            response = http_client.get(metadata["manifest_url"])
+            if response.status_code == 200:
+                metadata["manifest_icons"] = manifest_icons(response.text, metadata["manifest_url"])
+        except Exception as e:
+            print(f"Could not fetch the web manifest: {e}")
+    return image_candidates(metadata)
+
+
+def probe_image_cached(url: str) -> dict:
+    """
+    probe_image() through the image cache. Network errors and overloaded servers are not cached.
+    """
+    if CACHE_MODE == "on":
+        cached = IMAGE_CACHE.get(url)
+        if cached:
+            return cached
+    try:
+        probe = probe_image(url, IMAGE_PROBE_BYTES)
+    except Exception as e:
+        return {"url": url, "status": 0, "format": None, "width": None, "height": None, "error": str(e)}
+    if CACHE_MODE != "off" and probe["status"] not in http_client.RETRY_STATUSES:
+        IMAGE_CACHE.set(url, probe)
+    return probe
+
+
+@METRICS.timed("image_validation")
+async def choose_image(candidates: list[str]) -> str:
+    """
+    Probes the candidates concurrently and returns the best usable image by size, aspect
+    ratio and candidate order, or "" when none can be a thumbnail.
+    """
+    candidates = [url for url in candidates if url.startswith("http")][:IMAGE_MAX_CANDIDATES]
+    if not candidates:
+        return ""
+    probes = await asyncio.gather(*(asyncio.to_thread(probe_image_cached, url) for url in candidates))
+    best_url, best_score = "", 0.0
+    for rank, probe in enumerate(probes):
+        reason = probe.get("error") or rejection_reason(probe, IMAGE_MIN_SIDE)
+        if reason:
+            print(f"Rejected image {probe['url']}: {reason}")
+            continue
+        score = score_image(probe, rank)
+        if score > best_score:
+            best_url, best_score = probe["url"], score
+    if best_url:
+        print(f"Chose image {best_url} (score {best_score}).")
+    else:
+        print("No usable image found.")
+    return best_url
+
+def get_youtube_client():
+    """
+    Returns the process-wide YouTube API client, built once from the discovery document
+    bundled with google-api-python-client.
+    """
+    global _youtube_client
+    with _youtube_lock:
+        if _youtube_client is None:
+            client_options = {"api_endpoint": YOUTUBE_API_ENDPOINT} if YOUTUBE_API_ENDPOINT else None
+            _youtube_client = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY, client_options=client_options, static_discovery=True, cache_discovery=False)
+    return _youtube_client
 
+
+def youtube_http() -> httplib2.Http:
+    # httplib2 connections are not thread-safe, so each worker thread sends its requests on its own.
+    if not hasattr(_youtube_http, "http"):
+        _youtube_http.http = httplib2.Http(timeout=http_client.DEFAULT_TIMEOUT[1])
+    return _youtube_http.http
+
+
+def parse_iso_duration(duration: str) -> int:
+    # "PT1H2M3S" -> 3723 seconds
+    match = re.fullmatch(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?", duration or "")
+    if not match:
+        return 0
+    days, hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def rank_youtube_videos(tool_name: str, video_ids: list[str]) -> list[str]:
+    """
+    Orders search results with one videos().list call: videos that name the tool, have
+    more views and run 2-30 minutes (not Shorts or hour-long streams) come first.
+    """
+    YOUTUBE_LIMITER.acquire_sync()
+    YOUTUBE_QUOTA.spend(YOUTUBE_VIDEOS_UNITS, method="videos.list")
+    response = get_youtube_client().videos().list(
+        id=",".join(video_ids),
+        part='snippet,statistics,contentDetails',
+    ).execute(http=youtube_http())
+    details = {item["id"]: item for item in response.get("items", [])}
+    name = normalize_tool_name(tool_name)
+
+    def score(position_and_id):
+        position, video_id = position_and_id
+        item = details.get(video_id, {})
+        title = normalize_tool_name(item.get("snippet", {}).get("title", ""))
+        views = int(item.get("statistics", {}).get("viewCount", 0) or 0)
+        seconds = parse_iso_duration(item.get("contentDetails", {}).get("duration", ""))
+        length = 1.0 if 120 <= seconds <= 1800 else 0.3 if seconds < 60 else 0.6
+        # Search order still counts, as YouTube's own relevance signal.
+        return ((2.0 if name and name in title else 0.0) + math.log10(views + 1) + 0.2 * (len(video_ids) - position)) * length
+
+    return [video_id for _, video_id in sorted(enumerate(video_ids), key=score, reverse=True)]
+
+
+@METRICS.timed("youtube")
 def find_youtube_video(tool_name: str) -> str:
     """
     Searches YouTube for a relevant tutorial or explainer video.
+    Results are cached by tool name. When the daily quota is nearly spent, only cached
+    results (even stale ones) are used.
     """
     if not YOUTUBE_API_KEY:
         print("YouTube API key not found. Skipping video search.")
         return ""
-        
+
+    cache_key = normalize_tool_name(tool_name)
+    if CACHE_MODE == "on":
+        cached = YOUTUBE_CACHE.get(cache_key)
+        if cached is not None:
+            print(f"Using cached YouTube result for '{tool_name}'.")
+            return cached["video_url"]
+    # Checked and recorded in one step, keeping room for the videos().list ranking call.
+    headroom = YOUTUBE_VIDEOS_UNITS if YOUTUBE_RANK_RESULTS else 0
+    if not YOUTUBE_QUOTA.try_spend(YOUTUBE_SEARCH_UNITS, headroom=headroom, method="search.list"):
+        YOUTUBE_STATS["cache_only"] += 1
+        print("YouTube daily quota nearly used up, only using cached results.")
+        entry = YOUTUBE_CACHE.get_entry(cache_key) if CACHE_MODE != "off" else None
+        return entry["value"]["video_url"] if entry else ""
+
     print(f"Searching for YouTube video for '{tool_name}'...")
     try:
-        youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
-        
-        search_response = youtube.search().list(
+        YOUTUBE_LIMITER.acquire_sync()
+        YOUTUBE_STATS["searches"] += 1
+        search_response = get_youtube_client().search().list(
             q=f"{tool_name} overview explainer review",
             part='snippet',
             maxResults=5,
             type='video'
-        ).execute()
-        
-        videos = search_response.get('items', [])
-        if not videos:
+        ).execute(http=youtube_http())
+
+        video_ids = [item['id']['videoId'] for item in search_response.get('items', []) if item.get('id', {}).get('videoId')]
+        if not video_ids:
             print("No relevant YouTube videos found.")
-            return ""
-            
-        # Simple heuristic: return the first result
-        video_id = videos[0]['id']['videoId']
-        return f"https://www.youtube.com/watch?v={video_id}"
+        elif YOUTUBE_RANK_RESULTS and len(video_ids) > 1:
+            try:
+                video_ids = rank_youtube_videos(tool_name, video_ids)
+            except Exception as e:
+                # The search results are still good, just unranked.
+                print(f"Could not rank YouTube results: {e}")
+        video_url = f"https://www.youtube.com/watch?v={video_ids[0]}" if video_ids else ""
+        if CACHE_MODE != "off":
+            YOUTUBE_CACHE.set(cache_key, {"video_url": video_url, "video_ids": video_ids})
+        return video_url
 
     except Exception as e:
         print(f"Error searching YouTube: {e}")
+        METRICS.record_error("youtube")
         return ""
 
+def fetch_trending_questions(tool_name: str) -> str:
+    print(f"Searching for trending questions for '{tool_name}'...")
+    search_url = f"{GOOGLE_SEARCH_URL}?q={tool_name.replace(' ', '+')}+questions"
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    }
+    GOOGLE_LIMITER.acquire_sync(search_url)
+    response = http_client.get(search_url, headers=headers)
+    response.raise_for_status()
+    soup = BeautifulSoup(response.text, 'html.parser')
+
+    questions = []
+    # Selectors for "People also ask" questions. These may change.
+    # Common selectors found in Google search results.
+    selectors = [
+        "div.related-question-pair", # A common container for PAA
+        "div.wQ3Ihd", # Another possible selector
+        "div.V3FYCf" # And another
+    ]
+
+    for selector in selectors:
+        question_divs = soup.select(selector)
+        for div in question_divs:
+            question = div.get_text(strip=True)
+            if question.endswith('?'):
+                questions.append(question)
+        if questions:
+            break # Stop if we found questions with one selector
+
+    unique_questions = list(dict.fromkeys(questions))
+    return "\n".join(unique_questions[:5])
+
+
+@METRICS.timed("trending_questions")
 def get_trending_questions(tool_name: str) -> str:
     """
     Scrapes Google Search for "People also ask" questions.
     Note: This is dependent on Google's HTML structure and may break if they change it.
+    Lookups are cached and shared between concurrent callers (see GOOGLE_CACHE).
     """
-    print(f"Searching for trending questions for '{tool_name}'...")
     try:
-        search_url = f"https://www.google.com/search?q={tool_name.replace(' ', '+')}+questions"
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(search_url, headers=headers)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        questions = []
-        # Selectors for "People also ask" questions. These may change.
-        # Common selectors found in Google search results.
-        selectors = [
-            "div.related-question-pair", # A common container for PAA
-            "div.wQ3Ihd", # Another possible selector
-            "div.V3FYCf" # And another
-        ]
-
-        for selector in selectors:
-            question_divs = soup.select(selector)
-            for div in question_divs:
-                question = div.get_text(strip=True)
-                if question.endswith('?'):
-                    questions.append(question)
-            if questions:
-                break # Stop if we found questions with one selector
-
-        if questions:
-            unique_questions = list(dict.fromkeys(questions))
-            return "\n".join(unique_questions[:5])
-
+        return GOOGLE_CACHE.get_or_compute(f"questions|{normalize_tool_name(tool_name)}", lambda: fetch_trending_questions(tool_name), CACHE_MODE)
     except Exception as e:
         print(f"Error fetching trending questions: {e}")
-    
+        METRICS.record_error("trending_questions")
     return ""
 
 
+@METRICS.timed("link_conversion")
 def convert_links(content: str) -> str:
     """
     Converts markdown style links to plain URLs (removes markdown and HTML link formatting).
     """
     # Remove markdown links, keep only the URL
-    pattern = r'\[([^\]]+)\]\(([^\)]+)\)'
-    return re.sub(pattern, r'\2', content)
+    return MARKDOWN_LINK.sub(r'\2', content)
+
+
+MARKDOWN_LINK = re.compile(r'\[([^\]]+)\]\(([^\)]+)\)')
+# The start of a markdown link whose end has not arrived yet.
+PARTIAL_MARKDOWN_LINK = re.compile(r'\[[^\]]*(?:\](?:\([^\)]*)?)?\Z')
+
+
+class StreamingLinkConverter:
+    """
+    convert_links() for text that arrives in chunks.
+    feed() returns the text that is safe to emit. A trailing "[" that could still become a
+    markdown link is held back until the link is complete or clearly isn't one, so the
+    joined output is identical to convert_links() on the whole text.
+    """
+
+    # Link text longer than this is not a link, so stop holding it back.
+    MAX_PENDING_CHARS = 2000
+
+    def __init__(self):
+        self.pending = ""
+
+    def feed(self, chunk: str) -> str:
+        text = self.pending + chunk
+        # Links that are already complete can't change, whatever arrives next.
+        last_link_end = 0
+        for match in MARKDOWN_LINK.finditer(text):
+            last_link_end = match.end()
+        start = text.find("[", last_link_end)
+        while start != -1 and not (PARTIAL_MARKDOWN_LINK.match(text, start) and len(text) - start <= self.MAX_PENDING_CHARS):
+            start = text.find("[", start + 1)
+        if start == -1:
+            self.pending = ""
+            return MARKDOWN_LINK.sub(r'\2', text)
+        self.pending = text[start:]
+        return MARKDOWN_LINK.sub(r'\2', text[:start])
+
+    def flush(self) -> str:
+        text, self.pending = self.pending, ""
+        return MARKDOWN_LINK.sub(r'\2', text)
+
+
+def call_gemini(prompt: str, model_name: str = GEMINI_MODEL, generation_config: dict = None, on_chunk=None) -> str:
+    """
+    Sends a prompt to Gemini and returns the response text.
+    Requests identical to an earlier one (same model, prompt and settings) are answered
+    from the response cache without calling the model or using rate limit budget.
+    With `on_chunk`, the response is streamed and each piece of text is passed to
+    on_chunk(text) as it arrives (a cached response arrives as one piece).
+    """
+    request = json.dumps([model_name, prompt, generation_config or {}], sort_keys=True)
+    cache_key = hashlib.sha256(request.encode("utf-8")).hexdigest()
+    if GEMINI_CACHE_ENABLED and CACHE_MODE == "on":
+        cached = GEMINI_CACHE.get(cache_key)
+        if cached is not None:
+            print("Using cached Gemini response.")
+            if on_chunk:
+                on_chunk(cached)
+            return cached
+
+    GEMINI_LIMITER.acquire_sync()
+    if GEMINI_API_ENDPOINT:
+        genai.configure(api_key=GEMINI_API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+    else:
+        genai.configure(api_key=GEMINI_API_KEY)
+    model = genai.GenerativeModel(model_name, generation_config=generation_config)
+    if on_chunk:
+        pieces = []
+        for chunk in model.generate_content(prompt, stream=True):
+            try:
+                piece = chunk.text
+            except ValueError:
+                # Chunks with only a finish reason or safety ratings carry no text.
+                continue
+            pieces.append(piece)
+            on_chunk(piece)
+        text = "".join(pieces)
+    else:
+        text = model.generate_content(prompt).text
+    if GEMINI_CACHE_ENABLED and CACHE_MODE != "off" and text:
+        GEMINI_CACHE.set(cache_key, text)
+    return text
 
 
+def validate_genres(suggested_genres: list[str]) -> list[str]:
+    """
+    Keeps the suggestions that name one of `genres` (in its original casing), dropping the
+    too-broad "AI" and "Crypto".
+    """
+    # Create a map of normalized genres for efficient lookup
+    normalized_genres = {}
+    for g in genres:
+        normalized_genres.setdefault(g.strip().lower(), g)
+    valid_genres = []
+    for genre in suggested_genres:
+        normalized_suggested_genre = str(genre).strip().lower()
+        original_genre = normalized_genres.get(normalized_suggested_genre)
+        if original_genre and normalized_suggested_genre not in ['ai', 'crypto'] and original_genre not in valid_genres:
+            valid_genres.append(original_genre)
+    return valid_genres
+
+@METRICS.timed("genre")
 def get_genre_with_gemini(scraped_text: str) -> str:
     """
-    Uses Gemini to determine the best genres for a tool based on its scraped text.
+    Uses Gemini to determine the best genres for a tool based on its condensed page text.
     """
     print("Determining genre with Gemini...")
-    genai.configure(api_key=GEMINI_API_KEY)
-    
-    model = genai.GenerativeModel('gemini-2.5-flash')
-
     genres_str = ", ".join(genres)
 
     prompt = f"""
@@ -381,29 +1066,14 @@ def get_genre_with_gemini(scraped_text: str) -> str:
     Please respond with a comma-separated list of the most relevant genres from the list. You can return up to 3 genres. Do not respond with just "AI" or "Crypto".
 
     Website text:
-    {scraped_text[:4000]}
+    {scraped_text}
     """
     
     try:
-        response = model.generate_content(prompt)
-        suggested_genres_str = response.text.strip()
+        suggested_genres_str = call_gemini(prompt).strip()
         print(f"Gemini raw response for genre: {suggested_genres_str}")
         
-        # Validate the response from Gemini
-        suggested_genres = [genre.strip() for genre in suggested_genres_str.split(',')]
-        
-        valid_genres = []
-        # Create a set of normalized genres for efficient lookup
-        normalized_genres = {g.strip().lower() for g in genres}
-        
-        for genre in suggested_genres:
-            normalized_suggested_genre = genre.strip().lower()
-            if normalized_suggested_genre in normalized_genres and normalized_suggested_genre not in ['ai', 'crypto']:
-                # Find the original casing from the 'genres' list to return
-                original_genre = next((g for g in genres if g.strip().lower() == normalized_suggested_genre), None)
-                if original_genre:
-                    valid_genres.append(original_genre)
-        
+        valid_genres = validate_genres(suggested_genres_str.split(','))
         if valid_genres:
             print(f"Gemini genre suggestion: {valid_genres[0]}")
             return valid_genres[0]
@@ -413,17 +1083,166 @@ def get_genre_with_gemini(scraped_text: str) -> str:
             
     except Exception as e:
         print(f"Error determining genre with Gemini: {e}")
+        METRICS.record_error("genre")
         return ""
 
-def generate_content_with_gemini(scraped_text: str, tool_name: str, tool_url: str, contributor: str, plan_template: str, image_url: str, video_url: str, trending_questions: str) -> str:
+# Structured output for classify_genres_batch(): one entry per numbered tool in the prompt.
+GENRE_BATCH_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "tools": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "id": {"type": "integer"},
+                    "genres": {"type": "array", "items": {"type": "string"}},
+                },
+                "required": ["id", "genres"],
+            },
+        },
+    },
+    "required": ["tools"],
+}
+
+
+def classify_genres_batch(tools: list[tuple[str, str]]) -> dict[int, list[str]]:
     """
-    Generates content using Google's Gemini model based on a template and scraped text.
+    Classifies several (tool_name, condensed page text) pairs with one Gemini call.
+    Returns the validated genres for each tool by its 1-based position in `tools`; tools
+    the answer skipped or only gave invalid genres for are missing.
     """
-    print("Generating content with Gemini...")
-    genai.configure(api_key=GEMINI_API_KEY)
-    
-    model = genai.GenerativeModel('gemini-2.5-flash')
+    print(f"Determining genres for {len(tools)} tools with one Gemini call...")
+    genres_str = ", ".join(genres)
+    tools_text = "\n\n".join(
+        f"### Tool {number}: {tool_name}\n{scraped_text}"
+        for number, (tool_name, scraped_text) in enumerate(tools, start=1)
+    )
+    prompt = f"""
+    Based on the following text from the websites of {len(tools)} tools, which of these categories best describe each tool?
+    Categories: {genres_str}
+
+    Return up to 3 of the most relevant genres from the list for every tool, using the category names exactly as written. Do not respond with just "AI" or "Crypto".
+    Respond with JSON in the form {{"tools": [{{"id": <tool number>, "genres": ["<genre>", ...]}}]}}, with one entry per tool.
+
+    {tools_text}
+    """
+    response = call_gemini(prompt, generation_config={"response_mime_type": "application/json", "response_schema": GENRE_BATCH_SCHEMA})
+    answer = json.loads(response.strip().removeprefix("```json").removesuffix("```"))
+    entries = answer.get("tools", []) if isinstance(answer, dict) else answer
+    results = {}
+    for entry in entries:
+        if not isinstance(entry, dict) or not isinstance(entry.get("genres"), list):
+            continue
+        try:
+            number = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        valid_genres = validate_genres(entry["genres"])
+        if 1 <= number <= len(tools) and valid_genres:
+            results[number] = valid_genres
+    return results
+
+
+class GenreBatcher:
+    """
+    Collects genre requests from the tools of a batch run and answers them with
+    classify_genres_batch(), so a 500-tool file needs about 20 genre calls instead of 500.
+
+    submit() queues a tool and returns a future for its genre. A batch is sent once
+    `batch_size` tools are waiting, the oldest has waited `max_wait` seconds, or drain()
+    says no more tools are coming. Tools without a valid answer are queued again, and
+    get "" after `attempts` tries. Must be used from the event loop.
+    """
+
+    def __init__(self, batch_size: int = GENRE_BATCH_SIZE, max_wait: float = GENRE_BATCH_MAX_WAIT, attempts: int = GENRE_BATCH_ATTEMPTS):
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.attempts = max(1, attempts)
+        self.waiting = []
+        self.draining = False
+        self.stats = {"calls": 0, "tools": 0, "requeued": 0, "failed": 0}
+        self._timer = None
+        self._tasks = set()
+
+    def submit(self, tool_name: str, scraped_text: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue({"tool_name": tool_name, "text": scraped_text, "future": future, "attempt": 1})
+        return future
+
+    def drain(self):
+        """
+        Sends everything waiting now, and any later retries straight away.
+        """
+        self.draining = True
+        self.flush()
+
+    def flush(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        while self.waiting:
+            batch, self.waiting = self.waiting[:self.batch_size], self.waiting[self.batch_size:]
+            task = asyncio.ensure_future(self._classify(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _enqueue(self, item: dict):
+        self.waiting.append(item)
+        if self.draining or len(self.waiting) >= self.batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self.flush)
+
+    async def _classify(self, batch: list[dict]):
+        self.stats["calls"] += 1
+        self.stats["tools"] += len(batch)
+        try:
+            with METRICS.span("genre_batch"):
+                answers = await asyncio.to_thread(classify_genres_batch, [(item["tool_name"], item["text"]) for item in batch])
+        except Exception as e:
+            print(f"Error determining genres for a batch of {len(batch)} tools with Gemini: {e}")
+            answers = {}
+        retry = []
+        for number, item in enumerate(batch, start=1):
+            if number in answers:
+                self._resolve(item, answers[number][0])
+            elif item["attempt"] < self.attempts:
+                item["attempt"] += 1
+                retry.append(item)
+            else:
+                print(f"Gemini returned no valid genre for {item['tool_name']}.")
+                METRICS.record_error("genre")
+                self.stats["failed"] += 1
+                self._resolve(item, "")
+        if retry:
+            print(f"Re-queueing {len(retry)} tools without a valid genre.")
+            self.stats["requeued"] += len(retry)
+            for item in retry:
+                self._enqueue(item)
+
+    def _resolve(self, item: dict, genre: str):
+        if not item["future"].done():
+            item["future"].set_result(genre)
+
+def official_links(metadata: dict) -> str:
+    """
+    Formats the pricing page and social profiles from the page metadata for the generation prompt.
+    """
+    if not metadata:
+        return ""
+    links = [f"Pricing: {metadata['pricing_links'][0]}"] if metadata.get("pricing_links") else []
+    links += [f"{network.title()}: {url}" for network, url in metadata.get("social_links", {}).items()]
+    return "; ".join(links)
 
+
+@METRICS.timed("generation")
+def generate_content_with_gemini(scraped_text: str, tool_name: str, tool_url: str, contributor: str, plan_template: str, image_url: str, video_url: str, trending_questions: str, official_links: str = "", on_chunk=None) -> str:
+    """
+    Generates content using Google's Gemini model based on a template and the condensed page text.
+    With `on_chunk`, the post is streamed to it as it is written (see call_gemini).
+    """
+    print("Generating content with Gemini...")
     prompt = f"""
     You are a content creator for a tech blog. Your task is to create a blog post about a new tool, meticulously following the provided template's structure and formatting. Your writing style should be simple, accessible, and engaging, as if you're explaining the tool to a friend who is new to the tech space. Avoid jargon wherever possible.
 
@@ -446,19 +1265,35 @@ def generate_content_with_gemini(scraped_text: str, tool_name: str, tool_url: st
     - Image URL: {image_url}
     - Video URL: {video_url}
     - Trending Questions: {trending_questions}
-    - Scraped Content from Website: {scraped_text[:8000]}
+    - Official Links: {official_links}
+    - Scraped Content from Website: {scraped_text}
 
     Generate the full blog post based on the template, following all instructions perfectly.
     """
     
     try:
-        response = model.generate_content(prompt)
+        generated_content = call_gemini(prompt, on_chunk=on_chunk)
         print("Content generation complete.")
-        return response.text
+        return generated_content
     except Exception as e:
         print(f"Error generating content with Gemini: {e}")
+        METRICS.record_error("generation")
         return ""
 
+def tool_file_slug(tool_name: str) -> str:
+    """
+    The file name stem for a tool's output files: "Canva Pro" -> "canva_pro". Anything
+    but letters, digits, "_", "." and "-" becomes "_", so a name can't leave the output folder.
+    """
+    slug = re.sub(r"[^\w.-]", "_", tool_name.replace(' ', '_').lower()).lstrip(".")
+    return slug or "untitled"
+
+
+def html_preview_path(tool_name: str) -> str:
+    return os.path.join(HTML_OUTPUT_DIR, f"{tool_file_slug(tool_name)}.html")
+
+
+@METRICS.timed("html_save")
 def save_as_html(content: str, tool_name: str):
     """
     Saves the generated content as an HTML file for previewing.
@@ -466,23 +1301,67 @@ def save_as_html(content: str, tool_name: str):
     if not os.path.exists(HTML_OUTPUT_DIR):
         os.makedirs(HTML_OUTPUT_DIR)
     
-    file_path = os.path.join(HTML_OUTPUT_DIR, f"{tool_name.replace(' ', '_').lower()}.html")
+    file_path = html_preview_path(tool_name)
     
     with open(file_path, "w", encoding="utf-8") as f:
         f.write(content)
     print(f"Saved HTML preview to {file_path}")
 
-def save_tool_as_csv(data: dict, file_path=None, write_header=False):
+
+class HtmlPreviewWriter:
     """
-    Creates a CSV row for a tool. If file_path is provided, appends to that file. If write_header is True, writes header first.
+    Writes a tool's HTML preview while Gemini is still streaming the post (--stream).
+    Text is appended as it arrives, with links converted across chunk boundaries. Until
+    close(), the file starts with a meta refresh so a browser showing it keeps reloading.
+    close() replaces it with the finished post, or removes it if generation failed.
     """
-    if not os.path.exists(CSV_OUTPUT_DIR):
-        os.makedirs(CSV_OUTPUT_DIR)
 
-    headers = [
-        "Title","Author","Excerpt","Thumbnail","Language","Genres","Tags","Portrait Image","Movie Method","Movie URL","Content","Status"
-    ]
-    row = {h: "" for h in headers}
+    def __init__(self, tool_name: str):
+        if not os.path.exists(HTML_OUTPUT_DIR):
+            os.makedirs(HTML_OUTPUT_DIR)
+        self.path = html_preview_path(tool_name)
+        self.links = StreamingLinkConverter()
+        self.parts = []
+        self.started = time.monotonic()
+        self.first_content_seconds = None
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write(PREVIEW_REFRESH_TAG)
+        self._file.flush()
+
+    def write(self, chunk: str):
+        text = self.links.feed(chunk)
+        if not text:
+            return
+        if self.first_content_seconds is None:
+            self.first_content_seconds = time.monotonic() - self.started
+            METRICS.observe("generation_first_content", self.first_content_seconds)
+            print(f"First content after {self.first_content_seconds:.1f}s, streaming preview to {self.path}")
+        self.parts.append(text)
+        self._file.write(text)
+        self._file.flush()
+
+    def close(self, complete: bool = True) -> str:
+        """
+        Finishes the preview and returns the converted post.
+        """
+        self.parts.append(self.links.flush())
+        self._file.close()
+        content = "".join(self.parts)
+        if not complete or not content:
+            os.remove(self.path)
+            return ""
+        temp_file = f"{self.path}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp_file, self.path)
+        return content
+
+
+def csv_row(data: dict) -> dict:
+    """
+    Maps the data returned by process_tool() to a CSV_HEADERS row.
+    """
+    row = {h: "" for h in CSV_HEADERS}
     row["Title"] = data.get("tool_name", "Canva")
     row["Author"] = data.get("contributor", "TechCEO")
     row["Excerpt"] = data.get("excerpt", "A short summary for Canva.")
@@ -495,16 +1374,50 @@ def save_tool_as_csv(data: dict, file_path=None, write_header=False):
     row["Movie URL"] = data.get("video_url", "https://www.youtube.com/watch?v=F2xt7o1JqNw")
     row["Content"] = data.get("generated_content", "This is a test post for Canva. If this uploads, we can add more fields.")
     row["Status"] = "publish"
+    return row
+
+
+def csv_header_bytes() -> bytes:
+    buffer = io.StringIO(newline="")
+    csv.DictWriter(buffer, fieldnames=CSV_HEADERS, quoting=csv.QUOTE_ALL, delimiter=',').writeheader()
+    return buffer.getvalue().encode("utf-8")
+
+
+def csv_row_bytes(row: dict) -> bytes:
+    """
+    One CSV row (a CSV_HEADERS dict) encoded the way save_tool_as_csv() writes it.
+    """
+    buffer = io.StringIO(newline="")
+    csv.DictWriter(buffer, fieldnames=CSV_HEADERS, quoting=csv.QUOTE_ALL, delimiter=',').writerow({h: row.get(h, "") for h in CSV_HEADERS})
+    return buffer.getvalue().encode("utf-8")
+
+
+def tool_csv_path(tool_name: str) -> str:
+    return os.path.join(CSV_OUTPUT_DIR, f"{tool_file_slug(tool_name)}_post.csv")
+
+
+@METRICS.timed("csv_write")
+def save_tool_as_csv(data: dict, file_path=None, write_header=False, row: dict = None):
+    """
+    Creates a CSV row for a tool. If file_path is provided, appends to that file. If write_header is True, writes header first.
+    Pass `row` to write an existing CSV row (e.g. from the tool index) instead of building one from `data`.
+    """
+    if not os.path.exists(CSV_OUTPUT_DIR):
+        os.makedirs(CSV_OUTPUT_DIR)
+
+    headers = CSV_HEADERS
+    row = {h: row.get(h, "") for h in headers} if row else csv_row(data)
     if file_path:
         with open(file_path, 'a', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=headers, quoting=csv.QUOTE_ALL, delimiter=',')
             if write_header:
                 writer.writeheader()
             writer.writerow(row)
+            # Make sure the row is on disk before moving on, so a crash can't lose it.
+            f.flush()
+            os.fsync(f.fileno())
     else:
-        tool_name = data.get("tool_name", "untitled")
-        file_name = tool_name.replace(' ', '_').lower()
-        file_path = os.path.join(CSV_OUTPUT_DIR, f"{file_name}_post.csv")
+        file_path = tool_csv_path(data.get("tool_name", "untitled"))
         with open(file_path, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=headers, quoting=csv.QUOTE_ALL, delimiter=',')
             writer.writeheader()
@@ -512,144 +1425,991 @@ def save_tool_as_csv(data: dict, file_path=None, write_header=False):
         print(f"Successfully created CSV for WordPress: {file_path}")
 
 
+class BatchCsvWriter:
+    """
+    Streams batch rows to CSV as soon as each tool finishes, so memory stays flat and a
+    crash loses at most the row being written.
+    Rows are appended and fsynced to "<output>.partial", and the byte range and input line
+    of every row are logged to an index file ("<output>.partial.index", or `index_file`
+    for --processes shards). close() splices the rows into input line order and atomically
+    renames the result over the output, so the previous CSV is untouched until the batch
+    completes and the row order doesn't depend on which tool finished first.
+    """
 
-async def main(args):
+    def __init__(self, output_file: str, resume: bool = False, index_file: str = None):
+        self.output_file = output_file
+        self.partial_file = f"{output_file}.partial"
+        self.index_file = index_file or f"{self.partial_file}.index"
+        self.rows_written = 0
+        self.header_written = False
+        # Digests of the rows in the output, so has_row() can spot a row written twice.
+        self._row_digests = set()
+        if resume:
+            self._continue_previous_output()
+        else:
+            for path in (self.partial_file, self.index_file):
+                if os.path.exists(path):
+                    os.remove(path)
+        if index_file and not self.header_written:
+            self._write_header()
+
+    def _write_header(self):
+        with open(self.partial_file, 'wb') as f:
+            f.write(csv_header_bytes())
+            f.flush()
+            os.fsync(f.fileno())
+        self.header_written = True
+
+    def _read_index(self, index_file: str) -> list[tuple[int, int, int]]:
+        # [(input line, offset, length)] in the order the rows were written.
+        entries = []
+        if os.path.exists(index_file):
+            with open(index_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    entries.append((entry["line"] or 0, entry["offset"], entry["length"]))
+        return entries
+
+    def _log_rows(self, entries: list[tuple[int, int, int]], mode: str = 'a'):
+        # Logged after the rows are on disk, so every index entry points at a complete row.
+        with open(self.index_file, mode, encoding='utf-8') as f:
+            for line, offset, length in entries:
+                f.write(json.dumps({"line": line, "offset": offset, "length": length}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _splice(self, dst, sources: list[tuple[int, str, int, int]]) -> list[tuple[int, int, int]]:
+        # Copies the (line, file, offset, length) rows to the end of `dst` without parsing
+        # them, and returns their (line, offset, length) in `dst`.
+        entries = []
+        files = {}
+        try:
+            for line, path, offset, length in sources:
+                if path not in files:
+                    files[path] = open(path, 'rb')
+                src = files[path]
+                src.seek(offset)
+                chunk = src.read(length)
+                entries.append((line, dst.tell(), len(chunk)))
+                dst.write(chunk)
+                for row in csv.DictReader(io.StringIO(chunk.decode("utf-8"), newline=""), fieldnames=CSV_HEADERS):
+                    self._row_digests.add(self._digest(row))
+        finally:
+            for src in files.values():
+                src.close()
+        dst.flush()
+        os.fsync(dst.fileno())
+        return entries
+
+    def _continue_previous_output(self):
+        # Pick up the interrupted run's partial file, or the finished output if the last run
+        # completed. Only complete rows are kept, since a crash can cut the last row short:
+        # those in the partial file's index, or the rows that parse when there is no index.
+        # Rows of a finished output keep their order ahead of the new rows.
+        source = self.partial_file if os.path.exists(self.partial_file) else self.output_file
+        if not os.path.exists(source):
+            return
+        indexed = self._read_index(self.index_file) if source == self.partial_file else []
+        temp_file = f"{self.partial_file}.tmp"
+        with open(temp_file, 'wb') as dst:
+            dst.write(csv_header_bytes())
+            if indexed:
+                entries = self._splice(dst, [(line, source, offset, length) for line, offset, length in indexed])
+            else:
+                entries = []
+                with open(source, 'r', newline='', encoding='utf-8') as src:
+                    try:
+                        for row in csv.DictReader(src):
+                            if row.get("Status") and None not in row:
+                                chunk = csv_row_bytes(row)
+                                entries.append((0, dst.tell(), len(chunk)))
+                                dst.write(chunk)
+                                self._row_digests.add(self._digest(row))
+                    except csv.Error:
+                        pass
+                dst.flush()
+                os.fsync(dst.fileno())
+        os.replace(temp_file, self.partial_file)
+        self._log_rows(entries, mode='w')
+        self.rows_written = len(entries)
+        self.header_written = True
+        print(f"Continuing {self.output_file} with {self.rows_written} existing rows.")
+
+    def _digest(self, row: dict) -> str:
+        values = json.dumps([row.get(h, "") for h in CSV_HEADERS])
+        return hashlib.sha256(values.encode("utf-8")).hexdigest()
+
+    def has_row(self, row: dict) -> bool:
+        return self._digest(row) in self._row_digests
+
+    def write(self, data: dict, line_number: int = None, row: dict = None):
+        """
+        Appends a process_tool() result, or an existing CSV `row` as is.
+        """
+        if not self.header_written:
+            self._write_header()
+        start = os.path.getsize(self.partial_file)
+        save_tool_as_csv(data, file_path=self.partial_file, row=row)
+        self.rows_written += 1
+        self._row_digests.add(self._digest(row or csv_row(data)))
+        self._log_rows([(line_number, start, os.path.getsize(self.partial_file) - start)])
+
+    def merge_shards(self, shard_files: list[str]) -> int:
+        """
+        Appends the rows of --processes shard files (see `index_file`) in input line order,
+        copying each row's bytes without parsing it. Returns the number of rows merged.
+        """
+        sources = []
+        for shard_file in shard_files:
+            for line, offset, length in self._read_index(f"{shard_file}.index"):
+                sources.append((line, f"{shard_file}.partial", offset, length))
+        sources.sort()
+        if not self.header_written:
+            self._write_header()
+        with open(self.partial_file, 'ab') as dst:
+            entries = self._splice(dst, sources)
+        self._log_rows(entries)
+        self.rows_written += len(entries)
+        return len(entries)
+
+    def close(self):
+        if not self.header_written:
+            self._write_header()
+        entries = self._read_index(self.index_file)
+        # sorted() is stable, so rows without a line number keep the order they were written in.
+        ordered = sorted(entries, key=lambda entry: entry[0])
+        if ordered != entries:
+            temp_file = f"{self.partial_file}.tmp"
+            with open(temp_file, 'wb') as dst:
+                dst.write(csv_header_bytes())
+                self._splice(dst, [(line, self.partial_file, offset, length) for line, offset, length in ordered])
+            os.replace(temp_file, self.partial_file)
+        os.replace(self.partial_file, self.output_file)
+        if os.name != 'nt':
+            # Persist the rename itself.
+            directory = os.open(os.path.dirname(os.path.abspath(self.output_file)), os.O_RDONLY)
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        if os.path.exists(self.index_file):
+            os.remove(self.index_file)
+
+
+async def run_stage_graph(stages: dict, on_stage=None) -> dict:
     """
-    Main function to run the automation.
+    Runs a small dependency graph of async stages and returns {stage name: result}.
+    `stages` maps each stage name to (dependencies, function). A stage's function is called
+    with its dependencies' results as keyword arguments as soon as they are ready, so stages
+    that do not depend on each other run concurrently.
+    If given, `on_stage(name, status)` is called as each stage ends with "done", "empty"
+    (falsy result) or "failed" (exception).
     """
-    scraped_text, scraped_html = await scrape_website(args.url)
-    if not scraped_text:
-        return
+    tasks = {}
+
+    async def run(name):
+        dependencies, function = stages[name]
+        inputs = {dependency: await tasks[dependency] for dependency in dependencies}
+        try:
+            result = await function(**inputs)
+        except Exception:
+            if on_stage:
+                on_stage(name, "failed")
+            raise
+        if on_stage:
+            on_stage(name, "done" if result else "empty")
+        return result
+
+    for name in stages:
+        tasks[name] = asyncio.ensure_future(run(name))
+    try:
+        results = await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    return dict(zip(tasks, results))
 
-    genre = get_genre_with_gemini(scraped_text)
-    image_url = find_image_url(scraped_html, args.url)
-    if not image_url:
-        image_url = get_google_image(args.name)
-    video_url = find_youtube_video(args.name)
-    trending_questions = get_trending_questions(args.name)
 
-    generated_content = generate_content_with_gemini(
-        scraped_text, args.name, args.url, args.contributor, PLAN_TEMPLATE, image_url, video_url, trending_questions
-    )
-    if not generated_content:
-        return
-    
-    generated_content = convert_links(generated_content)
-        
-    save_as_html(generated_content, args.name)
+@METRICS.timed("tool")
+async def process_tool(tool_name: str, tool_url: str, contributor: str, on_stage=None, genre_batcher: GenreBatcher = None) -> dict:
+    """
+    Runs the full pipeline for one tool and returns the row data for the CSV.
+    Returns None if the site could not be scraped or no content was generated.
+    `on_stage(name, status)` is called as each stage finishes (see run_stage_graph).
+
+    After the scrape, genre detection, image discovery, the YouTube lookup and trending
+    questions run concurrently; generation starts once the stages it needs are done.
+    The image, video and generation stages share the metadata read from the home page.
+    Gemini gets the page text condensed by extract.py, packed into each prompt's token budget.
+    Blocking calls run in worker threads so the event loop is never held up.
+    With a genre_batcher the genre is only submitted to it, and the row's "category" is
+    a future that run_batch awaits once the rest of the tool is done.
+    """
+    async def scrape():
+        return await fetch_tool_page(tool_url)
+
+    async def page_content(scrape):
+        if not scrape["text"]:
+            return []
+        with METRICS.span("extract"):
+            if scrape["pages"]:
+                return await asyncio.to_thread(extract_page_sections, scrape["pages"])
+            return await asyncio.to_thread(extract_sections, scrape["html"], scrape["text"])
+
+    async def genre(page_content):
+        if not page_content:
+            return ""
+        if genre_batcher:
+            return genre_batcher.submit(tool_name, pack_sections(page_content, GENRE_BATCH_TOOL_TOKENS))
+        return await asyncio.to_thread(get_genre_with_gemini, pack_sections(page_content, GENRE_PROMPT_TOKENS))
+
+    async def image_url(scrape):
+        if not scrape["text"]:
+            return ""
+        candidates = await asyncio.to_thread(find_image_candidates, scrape["metadata"])
+        found_url = await choose_image(candidates)
+        if not found_url:
+            with METRICS.span("google_image_fallback"):
+                candidates = await asyncio.to_thread(get_google_images, tool_name)
+            found_url = await choose_image(candidates)
+        return found_url
+
+    async def video_url(scrape):
+        if not scrape["text"]:
+            return ""
+        if scrape["metadata"].get("youtube_videos"):
+            # The tool's own video beats a search, and costs no API quota.
+            print("Using the YouTube video embedded on the tool's page.")
+            return scrape["metadata"]["youtube_videos"][0]
+        return await asyncio.to_thread(find_youtube_video, tool_name)
+
+    async def trending_questions(scrape):
+        if not scrape["text"]:
+            return ""
+        return await asyncio.to_thread(get_trending_questions, tool_name)
+
+    async def generated_content(scrape, page_content, image_url, video_url, trending_questions):
+        if not page_content:
+            return ""
+        preview = HtmlPreviewWriter(tool_name) if STREAM_PREVIEW else None
+        content = await asyncio.to_thread(
+            generate_content_with_gemini,
+            pack_sections(page_content, GENERATION_PROMPT_TOKENS), tool_name, tool_url, contributor, PLAN_TEMPLATE, image_url, video_url, trending_questions,
+            official_links=official_links(scrape["metadata"]), on_chunk=preview.write if preview else None,
+        )
+        if preview:
+            return preview.close(complete=bool(content))
+        return convert_links(content) if content else ""
+
+    results = await run_stage_graph({
+        "scrape": ((), scrape),
+        "page_content": (("scrape",), page_content),
+        "genre": (("page_content",), genre),
+        "image_url": (("scrape",), image_url),
+        "video_url": (("scrape",), video_url),
+        "trending_questions": (("scrape",), trending_questions),
+        "generated_content": (("scrape", "page_content", "image_url", "video_url", "trending_questions"), generated_content),
+    }, on_stage=on_stage)
+    if not results["generated_content"]:
+        return None
 
     # Fill all fields to match sample format, using user/tool info where possible
-    data_for_csv = {
-        "tool_name": args.name,
-        "contributor": args.contributor,
-        "category": genre,
-        "generated_content": generated_content,
-        "image_url": image_url,
-        "video_url": video_url,
-        "tool_url": args.url,
-        "excerpt": f"A quick look at {args.name}...",
+    return {
+        "tool_name": tool_name,
+        "contributor": contributor,
+        "category": results["genre"],
+        "generated_content": results["generated_content"],
+        "image_url": results["image_url"],
+        "video_url": results["video_url"],
+        "tool_url": tool_url,
+        # Lets `refresh` tell whether the site's pricing or features changed since.
+        "content_hash": content_hash(results["page_content"]),
+        "excerpt": f"A quick look at {tool_name}...",
         "movie_method": "Movie URL",
-        "portrait_image": image_url,
+        "portrait_image": results["image_url"],
         "tags": "design,graphics",
         "status": "publish"
     }
+
+
+async def main(args):
+    """
+    Main function to run the automation.
+    """
+    if SKIP_KNOWN_TOOLS:
+        entry, matched = TOOL_INDEX.find(args.name, args.url)
+        if entry:
+            print(f"{args.name} {describe_known_tool(entry, matched)}; skipping. Pass --reprocess to generate it again.")
+            return
+    try:
+        data_for_csv = await process_tool(args.name, args.url, args.contributor)
+    finally:
+        await BROWSER_POOL.close()
+    if data_for_csv:
+        save_as_html(data_for_csv["generated_content"], args.name)
+        save_tool_as_csv(data_for_csv)
+        index_tool(data_for_csv, tool_csv_path(args.name))
+    METRICS.print_table()
+    if args.metrics_json:
+        METRICS.write_summary(args.metrics_json, run_stats())
+
+
+def read_tools_file(file_path: str) -> list[tuple[int, str, str]]:
+    """
+    Parses a tools file into (line_number, tool_name, tool_url) entries.
+    Each line holds a name and URL separated by "|" or ",". Blank lines and "#" comments are skipped.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    print(f"Found {len(lines)} lines in {file_path}")
+    tools = []
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if "|" in line:
+            parts = [p.strip() for p in line.split("|")]
+        else:
+            parts = [p.strip() for p in line.split(',')]
+        if len(parts) >= 2:
+            tools.append((i + 1, parts[0], parts[1]))
+    return tools
+
+
+def tool_key(tool_name: str, tool_url: str) -> str:
+    """
+    Identifies a tool across runs, independent of its position in the tools file.
+    """
+    return f"{tool_name.strip().lower()}|{canonicalize_url(tool_url)}"
+
+
+def describe_known_tool(entry: dict, matched: str) -> str:
+    return f"already has a post (same {matched} as {entry['name']} | {entry['url']})"
+
+
+def index_tool(data: dict, output_file: str):
+    """
+    Records a finished tool in the tool index.
+    """
+    try:
+        TOOL_INDEX.add(
+            data["tool_name"], data["tool_url"], csv_row(data), output_file,
+            content_hash=data.get("content_hash", ""), multi_page=MULTI_PAGE_SCRAPE,
+        )
+    except Exception as e:
+        print(f"Error updating the tool index for {data['tool_name']}: {e}")
+
+
+def skip_known_tools(tools: list[tuple[int, str, str]]) -> tuple[list, list]:
+    """
+    Drops tools listed earlier in `tools` under another spelling of their name or URL
+    (www, trailing slash, tracking parameters, http vs https), then splits the rest into
+    tools to process and tools the tool index already has a post for.
+    Returns (tools to process, [(line_number, tool_name, tool_url, index entry)]).
+    """
+    pending, known, seen = [], [], {}
+    for line_number, tool_name, tool_url in tools:
+        keys = [key for key in (canonical_tool_url(tool_url), normalize_tool_name(tool_name)) if key]
+        earlier = next((seen[key] for key in keys if key in seen), None)
+        if earlier:
+            print(f"Line {line_number}: {tool_name} repeats line {earlier}, skipping.")
+            continue
+        for key in keys:
+            seen[key] = line_number
+        entry, matched = TOOL_INDEX.find(tool_name, tool_url) if SKIP_KNOWN_TOOLS else (None, "")
+        if entry:
+            print(f"Line {line_number}: {tool_name} {describe_known_tool(entry, matched)}, skipping.")
+            known.append((line_number, tool_name, tool_url, entry))
+        else:
+            pending.append((line_number, tool_name, tool_url))
+    if len(pending) < len(tools):
+        print(f"Skipping {len(tools) - len(pending)} duplicate tools ({len(known)} already have a post).")
+    return pending, known
+
+
+def reuse_known_rows(known: list, writer: BatchCsvWriter, journal: Journal):
+    """
+    Writes the indexed rows of tools skipped by skip_known_tools(), so the output still
+    covers every tool in the tools file.
+    """
+    for line_number, tool_name, tool_url, entry in known:
+        writer.write({}, line_number, row=entry["row"])
+        journal.record(tool_key(tool_name, tool_url), "tool", "done", line=line_number, reused=entry["url"])
+
+
+def indexed_row_writer(writer: BatchCsvWriter, output_file: str):
+    """
+    An on_row callback for run_batch that writes the row and adds it to the tool index.
+    """
+    def on_row(data: dict, line_number: int):
+        writer.write(data, line_number)
+        index_tool(data, output_file)
+    return on_row
+
+
+def install_executor(pipelines: int):
+    """
+    Sizes the running loop's default executor (used by asyncio.to_thread) for `pipelines`
+    tools in flight, since each can have several stages waiting on blocking calls at once.
+    """
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max(8, pipelines * 5)))
+
+
+async def run_batch(tools: list[tuple[int, str, str]], contributor: str, concurrency: int, on_row, journal: Journal = None, genre_batcher: GenreBatcher = None) -> int:
+    """
+    Processes tools on a single event loop with at most `concurrency` tools in flight.
+    External services are throttled by their rate limiters instead of a fixed delay.
+    Each successful row is passed to `on_row(row, line_number)` as soon as its tool finishes.
+    With a journal, every stage is recorded; callers drop the tools it already marks
+    complete (see batch_main).
+    With a genre_batcher, a tool waits for its batched genre after giving up its slot, so
+    the batches can hold many more tools than `concurrency`.
+    Returns the number of successful rows.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    started = time.monotonic()
+    finished = 0
+    succeeded = 0
+    unstarted = len(tools)
+
+    async def run_one(line_number, tool_name, tool_url):
+        nonlocal finished, succeeded, unstarted
+        key = tool_key(tool_name, tool_url)
+        on_stage = None
+        if journal:
+            def on_stage(stage, status):
+                journal.record(key, stage, status)
+        async with semaphore:
+            print(f"Processing line {line_number}: {tool_name} | {tool_url}")
+            tool_started = time.monotonic()
+            row = None
+            try:
+                row = await process_tool(tool_name, tool_url, contributor, on_stage=on_stage, genre_batcher=genre_batcher)
+            except Exception as e:
+                print(f"Error processing {tool_name}: {e}")
+        if genre_batcher:
+            unstarted -= 1
+            if not unstarted:
+                # Every tool has submitted its genre, so nothing is worth waiting for.
+                genre_batcher.drain()
+            if row and asyncio.isfuture(row["category"]):
+                row["category"] = await row["category"]
+        try:
+            if row:
+                on_row(row, line_number)
+                succeeded += 1
+        except Exception as e:
+            print(f"Error processing {tool_name}: {e}")
+            row = None
+        if journal:
+            journal.record(key, "tool", "done" if row else "failed", line=line_number, seconds=round(time.monotonic() - tool_started, 3))
+        finished += 1
+        elapsed_minutes = (time.monotonic() - started) / 60
+        rate = finished / elapsed_minutes if elapsed_minutes > 0 else 0.0
+        print(f"Progress: {finished}/{len(tools)} tools done ({rate:.1f} tools/min)")
+
+    await asyncio.gather(*(
+        run_one(line_number, tool_name, tool_url)
+        for line_number, tool_name, tool_url in tools
+    ))
+    return succeeded
+
+
+def shard_files_for(output_file: str) -> list[str]:
+    """
+    Lists the shard outputs left next to `output_file` by a --processes run.
+    """
+    directory = os.path.dirname(output_file) or "."
+    prefix = f"{os.path.basename(output_file)}.shard"
+    shards = set()
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(".index"):
+            shards.add(os.path.join(directory, name[:-len(".index")]))
+    return sorted(shards)
+
+
+def remove_shard_files(shard_file: str):
+    for path in (f"{shard_file}.partial", f"{shard_file}.index"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def run_stats() -> dict:
+    """
+    Counters kept outside the stage metrics, for the end-of-run summary.
+    """
+    return {
+        "scrape_tiers": SCRAPE_STATS,
+        "scrape_cache": SCRAPE_CACHE.stats,
+        "gemini_cache": GEMINI_CACHE.stats,
+        "image_cache": IMAGE_CACHE.stats,
+        "youtube_cache": YOUTUBE_CACHE.stats,
+        "google_cache": GOOGLE_CACHE.stats,
+        "youtube": dict(YOUTUBE_STATS, quota=YOUTUBE_QUOTA.stats()),
+        "browser_pool": BROWSER_POOL.stats,
+        "http": http_client.STATS,
+    }
+
+
+def print_run_stats():
+    print(f"Scrape tiers: {SCRAPE_STATS}")
+    print(f"Scrape cache: {SCRAPE_CACHE.stats}")
+    print(f"Gemini cache: {GEMINI_CACHE.stats}")
+    print(f"Image cache: {IMAGE_CACHE.stats}")
+    print(f"Google cache: {GOOGLE_CACHE.stats}")
+    print(f"YouTube: {YOUTUBE_STATS}, cache {YOUTUBE_CACHE.stats}, quota {YOUTUBE_QUOTA.stats()}")
+    print(f"Browser pool: {BROWSER_POOL.stats}")
+    METRICS.print_table()
+
+
+def run_shard(shard_number: int, tools: list[tuple[int, str, str]], output_file: str, args) -> tuple[int, dict]:
+    """
+    Entry point of a --processes child: runs one shard of the batch on its own event loop
+    and browser pool, streaming rows to "<output>.shard<N>".
+    Returns the rows written and the shard's stage metrics.
+    """
+    apply_common_options(args)
+    # The rate limits are per service, so each process gets its share of them.
+    for limiter in (GEMINI_LIMITER, YOUTUBE_LIMITER, GOOGLE_LIMITER):
+        limiter.configure(limiter.rate / args.processes)
+    shard_file = f"{output_file}.shard{shard_number}"
+    writer = BatchCsvWriter(shard_file, index_file=f"{shard_file}.index")
+
+    async def run():
+        install_executor(args.concurrency)
+        # The parent has already dropped tools finished in earlier runs, so only append here.
+        journal = Journal(f"{output_file}.journal.jsonl", resume=True)
+        genre_batcher = GenreBatcher() if args.batch_genres else None
+        try:
+            return await run_batch(tools, args.contributor, args.concurrency, indexed_row_writer(writer, output_file), journal, genre_batcher)
+        finally:
+            await BROWSER_POOL.close()
+            journal.close()
+            if genre_batcher:
+                print(f"Genre batches: {genre_batcher.stats}")
+
+    rows_written = asyncio.run(run())
+    print(f"Shard {shard_number}: {rows_written} rows written.")
+    print_run_stats()
+    return rows_written, METRICS.state()
+
+
+def run_sharded_batch(tools: list[tuple[int, str, str]], output_file: str, args) -> int:
+    """
+    Splits the tools round-robin across args.processes child processes, so scraping, HTML
+    parsing and link conversion use more than one core. Returns the rows the shards wrote;
+    their stage metrics are merged into METRICS.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    processes = min(args.processes, len(tools))
+    shards = [tools[number::processes] for number in range(processes)]
+    print(f"Running {len(tools)} tools in {processes} processes with {args.concurrency} tools in flight each.")
+    rows_written = 0
+    # Fresh interpreters rather than forks, so no browser or event loop state is inherited.
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(run_shard, number + 1, shard, output_file, args) for number, shard in enumerate(shards)]
+        for number, future in enumerate(futures):
+            try:
+                shard_rows, shard_metrics = future.result()
+                rows_written += shard_rows
+                METRICS.merge(shard_metrics)
+            except Exception as e:
+                # Rows the shard finished before failing are still merged.
+                print(f"Shard {number + 1} failed: {e}")
+    return rows_written
+
+
+async def batch_main(args):
+    """
+    Runs every tool in args.tools_file and streams them all into one CSV.
+    With --processes N the tools are sharded across N processes and the rows are merged
+    back into input order at the end.
+    """
+    output_file = os.path.join(CSV_OUTPUT_DIR, "all_tools.csv")
+    if not os.path.exists(CSV_OUTPUT_DIR):
+        os.makedirs(CSV_OUTPUT_DIR)
+    tools = read_tools_file(args.tools_file)
+    # Posts made before the tool index existed are only in the last output.
+    imported = TOOL_INDEX.import_csv(output_file)
+    if imported:
+        print(f"Added {imported} tools from {output_file} to the tool index.")
+    writer = BatchCsvWriter(output_file, resume=args.resume)
+    journal = Journal(f"{output_file}.journal.jsonl", resume=args.resume)
+    # Shards left by an interrupted --processes run hold rows the journal marks complete.
+    for shard_file in shard_files_for(output_file):
+        if args.resume:
+            print(f"Recovered {writer.merge_shards([shard_file])} rows from {shard_file}")
+        remove_shard_files(shard_file)
+    pending = [tool for tool in tools if not journal.is_complete(tool_key(tool[1], tool[2]))]
+    if len(pending) < len(tools):
+        print(f"Skipping {len(tools) - len(pending)} tools already completed in an earlier run.")
+    pending, known = skip_known_tools(pending)
+    if args.resume:
+        # A crash between writing a row and journaling the tool leaves the row in the
+        # resumed output, and the tool in the index; don't write it a second time.
+        written = [tool for tool in known if writer.has_row(tool[3]["row"])]
+        for line_number, tool_name, tool_url, _ in written:
+            journal.record(tool_key(tool_name, tool_url), "tool", "done", line=line_number)
+        known = [tool for tool in known if tool not in written]
+    if args.processes > 1:
+        if known:
+            # Written as one more shard, so merge_shards() puts these rows in input order too.
+            shard_file = f"{output_file}.shard0"
+            reuse_known_rows(known, BatchCsvWriter(shard_file, index_file=f"{shard_file}.index"), journal)
+        journal.close()
+        rows_written = 0
+        if pending:
+            rows_written = await asyncio.to_thread(run_sharded_batch, pending, output_file, args)
+        shard_files = shard_files_for(output_file)
+        print(f"Merged {writer.merge_shards(shard_files)} shard rows in input order.")
+        for shard_file in shard_files:
+            remove_shard_files(shard_file)
+        # Reload the journal the shards appended to, for the failure count below.
+        journal = Journal(journal.path, resume=True)
+        journal.close()
+        METRICS.print_table()
+    else:
+        install_executor(args.concurrency)
+        genre_batcher = GenreBatcher() if args.batch_genres else None
+        reuse_known_rows(known, writer, journal)
+        try:
+            rows_written = await run_batch(pending, args.contributor, args.concurrency, indexed_row_writer(writer, output_file), journal, genre_batcher)
+        finally:
+            await BROWSER_POOL.close()
+            journal.close()
+            if genre_batcher:
+                print(f"Genre batches: {genre_batcher.stats}")
+        print_run_stats()
+    writer.close()
+    METRICS.write_summary(args.metrics_json or f"{output_file}.metrics.json", run_stats())
+    print(f"Finished processing. Rows written: {rows_written}, reused: {len(known)}, total rows: {writer.rows_written}, failed tools: {len(journal.failed)}")
+    print(f"Successfully created batch CSV: {output_file}")
+
+
+def append_batch_row(file_path: str, row: dict):
+    """
+    Appends one CSV row to a queued batch's CSV (see enqueue_tools_file) in a single
+    O_APPEND write, so rows from several worker processes never interleave.
+    """
+    fd = os.open(file_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, csv_row_bytes(row))
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+async def process_submission(job: dict) -> dict:
+    """
+    Job queue handler: runs the pipeline for a queued tool and saves its HTML preview and CSV.
+    Tools the tool index already has a post for are answered from their indexed row.
+    Jobs from --enqueue also append their row to their batch's CSV ("batch_csv").
+    """
+    if SKIP_KNOWN_TOOLS:
+        entry, matched = TOOL_INDEX.find(job["tool_name"], job["tool_url"])
+        if entry:
+            print(f"{job['tool_name']} {describe_known_tool(entry, matched)}, skipping.")
+            if job.get("batch_csv"):
+                await asyncio.to_thread(append_batch_row, job["batch_csv"], entry["row"])
+            return {
+                "duplicate_of": entry["url"],
+                "genre": entry["row"].get("Genres", ""),
+                "image_url": entry["row"].get("Thumbnail", ""),
+                "video_url": entry["row"].get("Movie URL", ""),
+            }
+    data_for_csv = await process_tool(job["tool_name"], job["tool_url"], job["contributor"])
+    if not data_for_csv:
+        raise RuntimeError("Could not scrape the site or generate content.")
+    save_as_html(data_for_csv["generated_content"], job["tool_name"])
     save_tool_as_csv(data_for_csv)
+    index_tool(data_for_csv, tool_csv_path(job["tool_name"]))
+    if job.get("batch_csv"):
+        await asyncio.to_thread(append_batch_row, job["batch_csv"], csv_row(data_for_csv))
+    return {
+        "genre": data_for_csv["category"],
+        "image_url": data_for_csv["image_url"],
+        "video_url": data_for_csv["video_url"],
+    }
+
+
+def open_job_queue() -> JobQueue:
+    return JobQueue(JOB_QUEUE_PATH, visibility_timeout=JOB_VISIBILITY_TIMEOUT, max_attempts=JOB_MAX_ATTEMPTS)
+
+
+def enqueue_tools_file(args):
+    """
+    Adds every tool in args.tools_file to the durable job queue for `worker` processes,
+    leaving out repeated tools and tools that already have a post.
+    The batch gets its own output_csv/queued_tools-<date>-<time>.csv, the queued
+    counterpart of all_tools.csv: it starts with the indexed rows of the known tools, and
+    workers append each queued tool's row as it finishes, so rows are in completion order.
+    """
+    queue = open_job_queue()
+    added = 0
+    tools, known = skip_known_tools(read_tools_file(args.tools_file))
+    batch_csv = os.path.join(CSV_OUTPUT_DIR, f"queued_tools-{time.strftime('%Y%m%d-%H%M%S')}.csv")
+    if not os.path.exists(CSV_OUTPUT_DIR):
+        os.makedirs(CSV_OUTPUT_DIR)
+    with open(batch_csv, 'wb') as f:
+        f.write(csv_header_bytes())
+    for _, _, _, entry in known:
+        append_batch_row(batch_csv, entry["row"])
+    for line_number, tool_name, tool_url in tools:
+        payload = {"tool_name": tool_name, "tool_url": tool_url, "contributor": args.contributor, "batch_csv": batch_csv}
+        job_id, created = queue.enqueue(payload, canonical_tool_url(tool_url), source="tools_file")
+        if created:
+            added += 1
+        else:
+            print(f"Line {line_number}: {tool_name} is already queued as job {job_id}, skipping.")
+    print(f"Queued {added} tools in {JOB_QUEUE_PATH}. Queue: {queue.counts()}")
+    print(f"Workers will add their rows to {batch_csv}.")
+
+
+async def worker_main(args):
+    """
+    Drains the durable job queue with args.workers concurrent pipelines.
+    """
+    install_executor(args.workers)
+    queue = open_job_queue()
+    metrics_server = None
+    if args.metrics_port:
+        metrics_server = await start_metrics_server(METRICS, args.metrics_host, args.metrics_port)
+    print(f"Worker draining {JOB_QUEUE_PATH} with {args.workers} workers. Queue: {queue.counts()}")
+    try:
+        await run_workers(queue, process_submission, args.workers, exit_when_empty=args.exit_when_empty)
+    finally:
+        await BROWSER_POOL.close()
+        if metrics_server:
+            await metrics_server.cleanup()
+        METRICS.print_table()
+        if args.metrics_json:
+            METRICS.write_summary(args.metrics_json, run_stats())
+    print(f"Worker finished. Queue: {queue.counts()}")
+
+
+async def refresh_tool(entry: dict, writer: BatchCsvWriter, check_only: bool = False) -> str:
+    """
+    Re-fetches one indexed tool, with conditional requests when its scrape is cached, and
+    regenerates its post only if the pricing or feature text it was written from changed
+    (see extract.content_hash). Returns "not_modified" (304 and the cached page matches the
+    post), "unchanged", "baseline" (no hash to compare with yet, so the current one is
+    stored), "changed" or "failed".
+    """
+    tool_name, tool_url = entry["name"], entry["url"]
+    # Hashes from single and multi-page scrapes can't be compared.
+    stored_hash = entry.get("content_hash", "") if entry.get("multi_page", False) == MULTI_PAGE_SCRAPE else ""
+    scrape = await fetch_tool_page(tool_url, revalidate=True)
+    if not scrape["text"]:
+        print(f"Could not fetch {tool_name}, keeping its post.")
+        return "failed"
+    # A 304 only says the cached scrape is current. That scrape may be newer than the post,
+    # e.g. after a --check_only run or a failed regeneration, so it is hashed too.
+    if scrape["pages"]:
+        sections = await asyncio.to_thread(extract_page_sections, scrape["pages"])
+    else:
+        sections = await asyncio.to_thread(extract_sections, scrape["html"], scrape["text"])
+    current_hash = content_hash(sections)
+    if not stored_hash:
+        TOOL_INDEX.add(tool_name, tool_url, entry["row"], entry["output"], content_hash=current_hash, multi_page=MULTI_PAGE_SCRAPE)
+        return "baseline"
+    if current_hash == stored_hash:
+        return "not_modified" if scrape["from_cache"] else "unchanged"
+    print(f"{tool_name} changed since its post was written.")
+    if check_only:
+        return "changed"
+    # The scrape just fetched is in the cache, so the pipeline doesn't fetch it again.
+    data = await process_tool(tool_name, tool_url, entry["row"].get("Author") or "AIC Community")
+    if not data:
+        print(f"Could not regenerate {tool_name}, keeping its post.")
+        return "failed"
+    save_as_html(data["generated_content"], tool_name)
+    writer.write(data)
+    index_tool(data, writer.output_file)
+    return "changed"
+
+
+async def refresh_main(args):
+    """
+    Checks every tool with a post (or just those in args.tools_file) for changes and writes
+    regenerated posts for the changed ones to a new output_csv/refreshed_tools-<date>-<time>.csv,
+    so earlier refreshes' rows are never overwritten. No file is written when nothing changed.
+    """
+    install_executor(args.concurrency)
+    imported = TOOL_INDEX.import_csv(os.path.join(CSV_OUTPUT_DIR, "all_tools.csv"))
+    if imported:
+        print(f"Added {imported} tools from all_tools.csv to the tool index.")
+    entries = TOOL_INDEX.entries()
+    if args.tools_file:
+        found = [TOOL_INDEX.find(tool_name, tool_url)[0] for _, tool_name, tool_url in read_tools_file(args.tools_file)]
+        wanted = {entry["url_key"] for entry in found if entry}
+        entries = [entry for entry in entries if entry["url_key"] in wanted]
+    output_file = os.path.join(CSV_OUTPUT_DIR, f"refreshed_tools-{time.strftime('%Y%m%d-%H%M%S')}.csv")
+    writer = BatchCsvWriter(output_file)
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    outcomes = {"not_modified": 0, "unchanged": 0, "baseline": 0, "changed": 0, "failed": 0}
+    print(f"Refreshing {len(entries)} tools, {args.concurrency} at a time.")
+
+    async def refresh_one(entry: dict):
+        async with semaphore:
+            try:
+                outcome = await refresh_tool(entry, writer, args.check_only)
+            except Exception as e:
+                print(f"Error refreshing {entry['name']}: {e}")
+                outcome = "failed"
+        outcomes[outcome] += 1
+        print(f"Refresh: {entry['name']} {outcome.replace('_', ' ')} ({sum(outcomes.values())}/{len(entries)})")
+
+    try:
+        await asyncio.gather(*(refresh_one(entry) for entry in entries))
+    finally:
+        await BROWSER_POOL.close()
+    if writer.rows_written:
+        writer.close()
+    print_run_stats()
+    if args.metrics_json:
+        METRICS.write_summary(args.metrics_json, run_stats())
+    print(
+        f"Refresh finished: {outcomes['not_modified']} not modified (304), {outcomes['unchanged']} unchanged, "
+        f"{outcomes['changed']} changed, {outcomes['baseline']} baselined, {outcomes['failed']} failed."
+    )
+    if args.check_only:
+        print("Nothing was regenerated (--check_only).")
+    elif writer.rows_written:
+        print(f"Regenerated posts are in {output_file} ({writer.rows_written} rows).")
+    else:
+        print("No posts needed regenerating.")
+
+
+def serve_main(args):
+    """
+    Runs the webhook ingestion server for tool_submission_form.html.
+    """
+    from aiohttp import web
+    from server import create_app
+
+    async def on_startup(app):
+        install_executor(args.workers)
+
+    app = create_app(
+        open_job_queue(), process_submission, workers=args.workers, queue_size=args.queue_size,
+        on_cleanup=BROWSER_POOL.close, metrics=METRICS, preview_path=html_preview_path,
+    )
+    app.on_startup.insert(0, on_startup)
+    print(f"Listening for submissions on http://{args.host}:{args.port}/submit with {args.workers} workers (queue: {JOB_QUEUE_PATH})")
+    print(f"Stage metrics are served at http://{args.host}:{args.port}/metrics")
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+def configure_rate_limits(args):
+    """
+    Applies the per-service rate limit flags.
+    """
+    if args.gemini_rpm is not None:
+        GEMINI_LIMITER.configure(args.gemini_rpm)
+    if args.youtube_rpm is not None:
+        YOUTUBE_LIMITER.configure(args.youtube_rpm)
+    if args.google_rpm is not None:
+        GOOGLE_LIMITER.configure(args.google_rpm)
+
+
+def apply_common_options(args):
+    """
+    Applies the rate limit, scraping and cache flags shared by every command.
+    """
+    global STATIC_FETCH, CACHE_MODE, GEMINI_CACHE_ENABLED, STREAM_PREVIEW, MULTI_PAGE_SCRAPE, SKIP_KNOWN_TOOLS
+    configure_rate_limits(args)
+    if args.no_block_resources:
+        BROWSER_POOL.configure(block_resources=False)
+    if args.browser_only:
+        STATIC_FETCH = False
+    if args.no_cache:
+        CACHE_MODE = "off"
+    elif args.refresh:
+        CACHE_MODE = "refresh"
+    if args.no_gemini_cache:
+        GEMINI_CACHE_ENABLED = False
+    if args.stream:
+        STREAM_PREVIEW = True
+    if args.multi_page:
+        MULTI_PAGE_SCRAPE = True
+    if args.reprocess:
+        SKIP_KNOWN_TOOLS = False
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser(description="Automate TechCEO content generation.")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--gemini_rpm", type=float, help="Max Gemini requests per minute (0 disables the limit).")
+    common.add_argument("--youtube_rpm", type=float, help="Max YouTube API requests per minute (0 disables the limit).")
+    common.add_argument("--google_rpm", type=float, help="Max Google search/image requests per minute (0 disables the limit).")
+    common.add_argument("--no_block_resources", action="store_true", help="Let scraped pages load images, fonts, stylesheets and trackers.")
+    common.add_argument("--browser_only", action="store_true", help="Always scrape with Chromium, skipping the static HTML fast path.")
+    common.add_argument("--no_cache", "--no-cache", action="store_true", help="Do not read or write the on-disk caches.")
+    common.add_argument("--refresh", action="store_true", help="Ignore cached results but store fresh ones.")
+    common.add_argument("--no_gemini_cache", action="store_true", help="Always call Gemini, even for prompts it has answered before.")
+    common.add_argument("--multi_page", action="store_true", help="Also read the pricing, docs and about pages linked from each tool's home page, in parallel.")
+    common.add_argument("--reprocess", action="store_true", help="Generate tools again even if the tool index already has a post for them.")
+    common.add_argument("--stream", action="store_true", help="Stream the post from Gemini and write the HTML preview as it arrives.")
+    common.add_argument("--metrics_json", type=str, help="Write per-stage timings and error counts to this JSON file at the end of the run.")
+
+    if os.name == 'nt':
+        asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        parser = argparse.ArgumentParser(prog="gemini_main.py serve", parents=[common], description="Accept tool submissions over HTTP and process them in the background.")
+        parser.add_argument("--host", type=str, default="0.0.0.0", help="Interface to listen on.")
+        parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8080")), help="Port to listen on.")
+        parser.add_argument("--workers", type=int, default=2, help="Number of submissions processed at once in this process (0 = only enqueue).")
+        parser.add_argument("--queue_size", type=int, default=50, help="Submissions that can wait before new ones get 429.")
+        args = parser.parse_args(sys.argv[2:])
+        apply_common_options(args)
+        serve_main(args)
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        parser = argparse.ArgumentParser(prog="gemini_main.py worker", parents=[common], description="Process tools from the durable job queue.")
+        parser.add_argument("--workers", type=int, default=2, help="Number of tools processed at once.")
+        parser.add_argument("--exit_when_empty", action="store_true", help="Stop once no jobs are ready instead of waiting for more.")
+        parser.add_argument("--metrics_port", type=int, help="Serve Prometheus metrics at http://<metrics_host>:<port>/metrics.")
+        parser.add_argument("--metrics_host", type=str, default="127.0.0.1", help="Interface for --metrics_port.")
+        args = parser.parse_args(sys.argv[2:])
+        apply_common_options(args)
+        asyncio.run(worker_main(args))
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "refresh":
+        parser = argparse.ArgumentParser(prog="gemini_main.py refresh", parents=[common], description="Regenerate the posts of tools whose pricing or feature text changed.")
+        parser.add_argument("--tools_file", type=str, help="Only refresh the tools listed in this file (default: every tool with a post).")
+        parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Number of tools checked at once.")
+        parser.add_argument("--check_only", action="store_true", help="Report which tools changed without regenerating them.")
+        args = parser.parse_args(sys.argv[2:])
+        apply_common_options(args)
+        asyncio.run(refresh_main(args))
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(parents=[common], description="Automate TechCEO content generation. See `gemini_main.py serve -h`, `gemini_main.py worker -h` and `gemini_main.py refresh -h` for the webhook server, queue workers and refreshing posts.")
     parser.add_argument("name", type=str, nargs="?", help="The name of the tool.")
     parser.add_argument("url", type=str, nargs="?", help="The URL of the tool's website.")
     parser.add_argument("--contributor", type=str, default="AIC Community", help="The contributor's name (optional).")
     parser.add_argument("--tools_file", type=str, help="Path to tools.md file containing tool names and links.")
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted --tools_file run, skipping tools that already finished.")
+    parser.add_argument("--enqueue", action="store_true", help="Add the --tools_file tools to the job queue for `worker` processes instead of running them now.")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Number of tools processed at once in batch mode.")
+    parser.add_argument("--processes", type=int, default=1, help="Split a --tools_file batch across this many processes, each with its own browser pool.")
+    parser.add_argument("--batch_genres", action="store_true", help="Classify the genres of many --tools_file tools with each Gemini call.")
     args = parser.parse_args()
+    apply_common_options(args)
 
-    async def process_tool(tool_name, tool_url, contributor, all_rows):
-        class Args:
-            pass
-        tool_args = Args()
-        tool_args.name = tool_name
-        tool_args.url = tool_url
-        tool_args.contributor = contributor
-        
-        scraped_text, scraped_html = await scrape_website(tool_url)
-        genre = get_genre_with_gemini(scraped_text)
-        image_url = find_image_url(scraped_html, tool_url)
-        if not image_url:
-            image_url = get_google_image(tool_name)
-        video_url = find_youtube_video(tool_name)
-        trending_questions = get_trending_questions(tool_name)
-        generated_content = generate_content_with_gemini(
-            scraped_text, tool_name, tool_url, contributor, PLAN_TEMPLATE, image_url, video_url, trending_questions
-        )
-        generated_content = convert_links(generated_content)
-        data_for_csv = {
-            "tool_name": tool_name,
-            "contributor": contributor,
-            "category": genre,
-            "generated_content": generated_content,
-            "image_url": image_url,
-            "video_url": video_url,
-            "tool_url": tool_url,
-            "excerpt": f"A quick look at {tool_name}...",
-            "movie_method": "Movie URL",
-            "portrait_image": image_url,
-            "tags": "design,graphics",
-            "status": "publish"
-        }
-        all_rows.append(data_for_csv)
-
-    if args.tools_file:
-        headers = [
-            "Title","Author","Excerpt","Thumbnail","Language","Genres","Tags","Portrait Image","Movie Method","Movie URL","Content","Status"
-        ]
-        output_file = os.path.join(CSV_OUTPUT_DIR, "all_tools.csv")
-        all_rows = []
-        with open(args.tools_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-        print(f"Found {len(lines)} lines in {args.tools_file}")
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            if "|" in line:
-                parts = [p.strip() for p in line.split("|")]
-            else:
-                parts = [p.strip() for p in line.split(',')]
-            if len(parts) >= 2:
-                tool_name, tool_url = parts[0], parts[1]
-                contributor = args.contributor
-                print(f"Processing line {i+1}: {line.strip()}")
-                if os.name == 'nt':
-                    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
-                asyncio.run(process_tool(tool_name, tool_url, contributor, all_rows))
-                print(f"Number of rows in all_rows: {len(all_rows)}")
-                time.sleep(10) # Add a 10-second delay between requests
-        print(f"Finished processing. Total rows to write: {len(all_rows)}")
-        # Write all rows to one CSV
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=headers, quoting=csv.QUOTE_ALL, delimiter=',')
-            writer.writeheader()
-            for row in all_rows:
-                # Convert to correct row format
-                out_row = {h: "" for h in headers}
-                out_row["Title"] = row.get("tool_name", "")
-                out_row["Author"] = row.get("contributor", "")
-                out_row["Excerpt"] = row.get("excerpt", "")
-                out_row["Thumbnail"] = row.get("image_url", "")
-                out_row["Language"] = row.get("language", "en")
-                out_row["Genres"] = row.get("category", "")
-                out_row["Tags"] = row.get("tags", "")
-                out_row["Portrait Image"] = row.get("portrait_image", "")
-                out_row["Movie Method"] = row.get("movie_method", "Movie URL")
-                out_row["Movie URL"] = row.get("video_url", "")
-                out_row["Content"] = row.get("generated_content", "")
-                out_row["Status"] = row.get("status", "publish")
-                writer.writerow(out_row)
-        print(f"Successfully created batch CSV: {output_file}")
+    if args.tools_file and args.enqueue:
+        enqueue_tools_file(args)
+    elif args.tools_file:
+        asyncio.run(batch_main(args))
     elif args.name and args.url:
-        if os.name == 'nt':
-            asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
         asyncio.run(main(args))
     else:
-        print("Please provide either a tool name and URL, or --tools_file with a list of tools.")
\ No newline at end of file
+        print("Please provide either a tool name and URL, or --tools_file with a list of tools.")
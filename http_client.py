@@ -0,0 +1,166 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# httpx is optional and only used when HTTP/2 is switched on.
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Browser-like headers so sites serve the same HTML they would give Chromium.
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+# (connect, read) timeouts in seconds.
+DEFAULT_TIMEOUT = (float(os.getenv("HTTP_CONNECT_TIMEOUT", "5")), float(os.getenv("HTTP_READ_TIMEOUT", "15")))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", "6"))
+MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BACKOFF_SECONDS = float(os.getenv("HTTP_BACKOFF_SECONDS", "0.5"))
+MAX_BACKOFF_SECONDS = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+USE_HTTP2 = os.getenv("HTTP2", "0") == "1"
+
+STATS = {"requests": 0, "retries": 0, "errors": 0}
+
+_client = None
+_client_lock = threading.Lock()
+_host_slots = {}
+
+
+def get_client():
+    """
+    Returns the process-wide client so connections are kept alive and reused.
+    This is a requests.Session, or an httpx.Client speaking HTTP/2 when HTTP2=1 and
+    httpx is installed with its http2 extra.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            if USE_HTTP2 and httpx is not None:
+                _client = httpx.Client(http2=True, headers=DEFAULT_HEADERS, follow_redirects=True)
+            else:
+                if USE_HTTP2:
+                    print("HTTP/2 needs `pip install httpx[http2]`, using HTTP/1.1.")
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=64, pool_maxsize=MAX_CONNECTIONS_PER_HOST)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _client = session
+    return _client
+
+
+def _host_slot(host: str) -> threading.BoundedSemaphore:
+    with _client_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(MAX_CONNECTIONS_PER_HOST)
+        return _host_slots[host]
+
+
+def _retry_delay(attempt: int, response) -> float:
+    # Honour Retry-After when the server sends one, otherwise back off exponentially with jitter.
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after:
+        try:
+            return min(MAX_BACKOFF_SECONDS, max(0.0, float(retry_after)))
+        except ValueError:
+            try:
+                return min(MAX_BACKOFF_SECONDS, max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+    delay = min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _transport_errors() -> tuple:
+    errors = (requests.ConnectionError, requests.Timeout)
+    if httpx is not None:
+        errors += (httpx.TransportError,)
+    return errors
+
+
+def request(method: str, url: str, **kwargs):
+    """
+    Sends a request through the shared client.
+    Applies the default timeouts and per-host connection limit, and retries connection
+    errors and 429/5xx responses with jittered exponential backoff.
+    """
+    timeout = kwargs.pop("timeout", DEFAULT_TIMEOUT)
+    client = get_client()
+    if httpx is not None and isinstance(client, httpx.Client) and isinstance(timeout, tuple):
+        timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+    host = urlsplit(url).hostname or ""
+    attempt = 0
+    while True:
+        response, error = None, None
+        with _host_slot(host):
+            STATS["requests"] += 1
+            try:
+                response = client.request(method, url, timeout=timeout, **kwargs)
+            except _transport_errors() as e:
+                error = e
+        if error is None and response.status_code not in RETRY_STATUSES:
+            return response
+        if attempt >= MAX_RETRIES:
+            if error is not None:
+                STATS["errors"] += 1
+                raise error
+            return response
+        STATS["retries"] += 1
+        delay = _retry_delay(attempt, response)
+        if response is not None:
+            # Hand the connection back to the pool instead of holding it through the backoff
+            # (streamed responses, see get_range, keep it until closed).
+            response.close()
+        time.sleep(delay)
+        attempt += 1
+
+
+def get(url: str, **kwargs):
+    """
+    GET through the shared client.
+    """
+    return request("GET", url, **kwargs)
+
+
+def get_range(url: str, max_bytes: int, **kwargs) -> tuple:
+    """
+    Fetches only the start of a resource: asks for the first `max_bytes` with a Range
+    header and stops reading there even if the server ignores it and sends everything.
+    Returns (response, data). The response body has been closed.
+    """
+    headers = dict(kwargs.pop("headers", None) or {})
+    headers["Range"] = f"bytes=0-{max_bytes - 1}"
+    client = get_client()
+    if httpx is not None and isinstance(client, httpx.Client):
+        with _host_slot(urlsplit(url).hostname or ""):
+            STATS["requests"] += 1
+            timeout = kwargs.pop("timeout", DEFAULT_TIMEOUT)
+            if isinstance(timeout, tuple):
+                timeout = httpx.Timeout(timeout[1], connect=timeout[0])
+            with client.stream("GET", url, headers=headers, timeout=timeout, **kwargs) as response:
+                return response, _read_prefix(response.iter_bytes(), max_bytes)
+    response = request("GET", url, headers=headers, stream=True, **kwargs)
+    try:
+        return response, _read_prefix(response.iter_content(chunk_size=16384), max_bytes)
+    finally:
+        response.close()
+
+
+def _read_prefix(chunks, max_bytes: int) -> bytes:
+    data = b""
+    for chunk in chunks:
+        data += chunk
+        if len(data) >= max_bytes:
+            break
+    return data[:max_bytes]
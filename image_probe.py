@@ -0,0 +1,134 @@
+import math
+import re
+import struct
+
+import http_client
+
+# Formats WordPress can use as a post thumbnail.
+THUMBNAIL_FORMATS = {"jpeg", "png", "gif", "webp", "avif"}
+# Aspect ratios (width / height) that fit a thumbnail without heavy cropping:
+# square logos up to 2:1 social cards.
+GOOD_ASPECT = (0.75, 2.0)
+# Side length in px past which a bigger image is no better.
+IDEAL_SIDE = 600
+# How much each later candidate (see page_metadata.image_candidates) is trusted less.
+RANK_PENALTY = 0.15
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(data: bytes):
+    # Walks the segments to the first start-of-frame, which holds the dimensions.
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            i += 1
+            continue
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        if marker in JPEG_SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            height, width = struct.unpack(">HH", data[i + 5:i + 9])
+            return width, height
+        i += 2 + struct.unpack(">H", data[i + 2:i + 4])[0]
+    return None
+
+
+def sniff_image(data: bytes) -> dict:
+    """
+    Reads an image's format and dimensions from its first bytes.
+    Returns {"format", "width", "height"}, with None dimensions when they were not in
+    `data` (or the format has none, like SVG), or None if `data` is not an image.
+    """
+    size = None
+    if data.startswith(b"\x89PNG\r\n\x1a\n") and data[12:16] == b"IHDR" and len(data) >= 24:
+        image_format, size = "png", struct.unpack(">II", data[16:24])
+    elif data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        image_format, size = "gif", struct.unpack("<HH", data[6:10])
+    elif data.startswith(b"\xff\xd8"):
+        image_format, size = "jpeg", _jpeg_size(data)
+    elif data[:4] == b"RIFF" and data[8:12] == b"WEBP" and len(data) >= 30:
+        image_format, chunk = "webp", data[12:16]
+        if chunk == b"VP8 " and data[23:26] == b"\x9d\x01\x2a":
+            width, height = struct.unpack("<HH", data[26:30])
+            size = (width & 0x3FFF, height & 0x3FFF)
+        elif chunk == b"VP8L" and data[20] == 0x2F:
+            bits = int.from_bytes(data[21:25], "little")
+            size = ((bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+        elif chunk == b"VP8X":
+            size = (int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1)
+    elif data[4:8] == b"ftyp" and data[8:12] in (b"avif", b"avis", b"heic", b"heix", b"mif1", b"msf1"):
+        image_format = "avif" if data[8:12] in (b"avif", b"avis") else "heic"
+        # The image spatial extents ("ispe") property holds the dimensions.
+        ispe = data.find(b"ispe")
+        if ispe != -1 and len(data) >= ispe + 16:
+            size = struct.unpack(">II", data[ispe + 8:ispe + 16])
+    elif data[:2] == b"BM" and len(data) >= 26:
+        width, height = struct.unpack("<ii", data[18:26])
+        image_format, size = "bmp", (width, abs(height))
+    elif data[:4] == b"\x00\x00\x01\x00" and len(data) >= 22:
+        # Icon files hold several sizes; a 0 byte means 256 px.
+        count = struct.unpack("<H", data[4:6])[0]
+        entries = [data[6 + 16 * n:8 + 16 * n] for n in range(count) if len(data) >= 8 + 16 * n]
+        image_format, size = "ico", max(((e[0] or 256, e[1] or 256) for e in entries), default=None)
+    elif re.match(rb"\s*(?:\xef\xbb\xbf)?\s*(?:<\?xml[^>]*>\s*)?(?:<!--.*?-->\s*)*(?:<!doctype svg[^>]*>\s*)?<svg", data[:2048], re.IGNORECASE | re.DOTALL):
+        image_format = "svg"
+    else:
+        return None
+    width, height = size if size else (None, None)
+    return {"format": image_format, "width": width, "height": height}
+
+
+def probe_image(url: str, max_bytes: int = 65536) -> dict:
+    """
+    Downloads just enough of an image to read its format and size.
+    Returns {"url", "status", "format", "width", "height"}, where "format" is None when
+    the URL did not answer with an image. Raises on network errors.
+    """
+    response, data = http_client.get_range(url, max_bytes)
+    info = sniff_image(data) if response.status_code in (200, 206) else None
+    if info and info["format"] == "jpeg" and info["width"] is None and response.status_code == 206 and len(data) >= max_bytes:
+        # Large EXIF or colour profile blocks can push the frame header further in.
+        response, data = http_client.get_range(url, max_bytes * 8)
+        info = sniff_image(data) if response.status_code in (200, 206) else None
+    result = {"url": url, "status": response.status_code, "format": None, "width": None, "height": None}
+    if info:
+        result.update(info)
+    return result
+
+
+def rejection_reason(probe: dict, min_side: int) -> str:
+    """
+    Why a probed image can't be a thumbnail, or "" if it can.
+    """
+    if probe["status"] not in (200, 206):
+        return f"HTTP {probe['status']}"
+    if not probe["format"]:
+        return "not an image"
+    if probe["format"] not in THUMBNAIL_FORMATS:
+        return f"{probe['format']} is not a thumbnail format"
+    if not probe["width"] or not probe["height"]:
+        return "unknown size"
+    if min(probe["width"], probe["height"]) < min_side:
+        return f"too small ({probe['width']}x{probe['height']})"
+    return ""
+
+
+def score_image(probe: dict, rank: int) -> float:
+    """
+    Scores a usable image by size, aspect ratio and its place in the candidate list.
+    """
+    width, height = probe["width"], probe["height"]
+    size = min(1.0, min(width, height) / IDEAL_SIDE)
+    ratio = width / height
+    low, high = GOOD_ASPECT
+    # Each doubling of the distance outside the good range halves the score.
+    off_by = max(low / ratio, ratio / high, 1.0)
+    aspect = 1 / (1 + math.log2(off_by))
+    return round(size * aspect / (1 + RANK_PENALTY * rank), 4)
@@ -0,0 +1,247 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    dedupe_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    source TEXT NOT NULL DEFAULT '',
+    priority INTEGER NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT,
+    result TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_key ON jobs(dedupe_key) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs(status, available_at);
+"""
+
+# Columns added after the first release, for queue files created before them.
+ADDED_COLUMNS = {
+    "source": "TEXT NOT NULL DEFAULT ''",
+    "priority": "INTEGER NOT NULL DEFAULT 0",
+}
+
+
+class JobQueue:
+    """
+    Durable job queue in a local SQLite file, safe to share between processes on one host.
+
+    Jobs move queued -> running -> done. A worker leases a job for `visibility_timeout`
+    seconds; if it crashes or stops renewing the lease, the job becomes available again.
+    Failed attempts are retried with backoff until `max_attempts`, then the job is parked
+    in the "dead" state. Only one queued or running job can exist per dedupe key.
+    Jobs with a higher priority are leased first, and each job records its `source`
+    (e.g. "webhook"), so counts() can tell submissions apart from bulk jobs.
+    """
+
+    def __init__(self, path: str, visibility_timeout: float = 600, max_attempts: int = 3, retry_backoff: float = 30):
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+            columns = {row["name"] for row in db.execute("PRAGMA table_info(jobs)")}
+            for column, definition in ADDED_COLUMNS.items():
+                if column not in columns:
+                    db.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+
+    @contextmanager
+    def _connect(self):
+        # A short-lived connection per operation keeps this safe to call from any thread.
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA busy_timeout=30000")
+            yield db
+        finally:
+            db.close()
+
+    def _job(self, row) -> dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def enqueue(self, payload: dict, dedupe_key: str, source: str = "", priority: int = 0) -> tuple[str, bool]:
+        """
+        Adds a job unless one with the same key is already queued or running.
+        Returns (job id, created) where created is False for a duplicate.
+        """
+        now = time.time()
+        job_id = uuid.uuid4().hex
+        with self._connect() as db:
+            try:
+                db.execute(
+                    "INSERT INTO jobs (id, dedupe_key, payload, status, source, priority, max_attempts, available_at, created_at, updated_at) "
+                    "VALUES (?, ?, ?, 'queued', ?, ?, ?, ?, ?, ?)",
+                    (job_id, dedupe_key, json.dumps(payload), source, priority, self.max_attempts, now, now, now),
+                )
+                return job_id, True
+            except sqlite3.IntegrityError:
+                pass
+        return self.find_active(dedupe_key), False
+
+    def find_active(self, dedupe_key: str) -> str:
+        """
+        Returns the id of the queued or running job with this key, or "".
+        """
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT id FROM jobs WHERE dedupe_key = ? AND status IN ('queued', 'running')", (dedupe_key,)
+            ).fetchone()
+        return row["id"] if row else ""
+
+    def lease(self, owner: str) -> dict:
+        """
+        Claims the oldest available job of the highest priority for `owner`, or returns None
+        if there is none.
+        Jobs whose lease expired are reclaimed here; those out of attempts become dead.
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    "UPDATE jobs SET status = 'dead', last_error = 'Lease expired too many times', updated_at = ? "
+                    "WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts",
+                    (now, now),
+                )
+                row = db.execute(
+                    "SELECT * FROM jobs WHERE (status = 'queued' AND available_at <= ?) "
+                    "OR (status = 'running' AND lease_expires < ?) ORDER BY priority DESC, available_at, created_at LIMIT 1",
+                    (now, now),
+                ).fetchone()
+                if row is None:
+                    db.execute("COMMIT")
+                    return None
+                db.execute(
+                    "UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                    "WHERE id = ?",
+                    (owner, now + self.visibility_timeout, now, row["id"]),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        job = self._job(row)
+        job["status"] = "running"
+        job["attempts"] += 1
+        job["lease_owner"] = owner
+        return job
+
+    def extend(self, job_id: str, owner: str) -> bool:
+        """
+        Renews a lease for another visibility timeout. Returns False if the lease was lost.
+        """
+        now = time.time()
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                (now + self.visibility_timeout, now, job_id, owner),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: str, owner: str, result: dict = None):
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE id = ? AND lease_owner = ?",
+                (json.dumps(result) if result is not None else None, time.time(), job_id, owner),
+            )
+
+    def fail(self, job_id: str, owner: str, error: str):
+        """
+        Records a failed attempt: the job is retried after a backoff, or marked dead once
+        it has used all of its attempts.
+        """
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ? AND lease_owner = ?", (job_id, owner)).fetchone()
+            if row is None:
+                return
+            if row["attempts"] >= row["max_attempts"]:
+                db.execute(
+                    "UPDATE jobs SET status = 'dead', last_error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ?",
+                    (error, now, job_id),
+                )
+            else:
+                delay = self.retry_backoff * 2 ** (row["attempts"] - 1)
+                db.execute(
+                    "UPDATE jobs SET status = 'queued', last_error = ?, lease_owner = NULL, lease_expires = NULL, "
+                    "available_at = ?, updated_at = ? WHERE id = ?",
+                    (error, now + delay, now, job_id),
+                )
+
+    def get(self, job_id: str) -> dict:
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job(row) if row else None
+
+    def counts(self, source: str = None) -> dict:
+        """
+        Returns the number of jobs in each state, only counting jobs from `source` if given.
+        """
+        counts = {"queued": 0, "running": 0, "done": 0, "dead": 0}
+        query = "SELECT status, COUNT(*) AS total FROM jobs"
+        params = ()
+        if source is not None:
+            query += " WHERE source = ?"
+            params = (source,)
+        with self._connect() as db:
+            for row in db.execute(query + " GROUP BY status", params):
+                counts[row["status"]] = row["total"]
+        return counts
+
+
+async def run_workers(queue: JobQueue, handle_job, workers: int, exit_when_empty: bool = False, poll_interval: float = 2.0):
+    """
+    Drains `queue` with `workers` concurrent tasks, calling `await handle_job(payload)` for
+    each leased job. Leases are renewed while a job runs. Runs until cancelled, or until the
+    queue has nothing ready when `exit_when_empty` is set.
+    """
+    host = socket.gethostname()
+
+    async def keep_lease(job_id: str, owner: str):
+        while True:
+            await asyncio.sleep(queue.visibility_timeout / 3)
+            await asyncio.to_thread(queue.extend, job_id, owner)
+
+    async def worker(number: int):
+        owner = f"{host}:{os.getpid()}:{number}"
+        while True:
+            job = await asyncio.to_thread(queue.lease, owner)
+            if job is None:
+                if exit_when_empty:
+                    return
+                await asyncio.sleep(poll_interval)
+                continue
+            print(f"Worker {number} processing {job['payload'].get('tool_name')} ({job['id']}, attempt {job['attempts']})")
+            heartbeat = asyncio.create_task(keep_lease(job["id"], owner))
+            try:
+                result = await handle_job(job["payload"])
+                await asyncio.to_thread(queue.complete, job["id"], owner, result)
+            except Exception as e:
+                print(f"Job {job['id']} failed: {e}")
+                await asyncio.to_thread(queue.fail, job["id"], owner, str(e))
+            finally:
+                heartbeat.cancel()
+
+    await asyncio.gather(*(worker(number + 1) for number in range(max(1, workers))))
@@ -0,0 +1,60 @@
+import json
+import os
+import time
+
+
+class Journal:
+    """
+    Append-only JSONL log of batch progress, one record per tool stage.
+    Every record is fsynced, so after a crash the journal shows exactly which tools
+    finished ("tool" stage "done") and which failed or never completed.
+    """
+
+    def __init__(self, path: str, resume: bool = False):
+        self.path = path
+        self.completed = set()
+        self.failed = set()
+        if resume and os.path.exists(path):
+            self._load()
+        elif os.path.exists(path):
+            os.remove(path)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash can leave the last line half-written.
+                    continue
+                if record.get("stage") != "tool":
+                    continue
+                if record.get("status") == "done":
+                    self.completed.add(record["key"])
+                    self.failed.discard(record["key"])
+                else:
+                    self.failed.add(record["key"])
+
+    def is_complete(self, key: str) -> bool:
+        return key in self.completed
+
+    def record(self, key: str, stage: str, status: str, **details):
+        """
+        Appends a stage result, e.g. record(key, "scrape", "done", tier="static").
+        The "tool" stage marks the whole tool as done or failed.
+        """
+        entry = {"key": key, "stage": stage, "status": status, "time": time.time()}
+        entry.update(details)
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if stage == "tool":
+            if status == "done":
+                self.completed.add(key)
+                self.failed.discard(key)
+            else:
+                self.failed.add(key)
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,221 @@
+import asyncio
+import functools
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds, from a cached lookup to a slow generation.
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+# Recent durations kept per stage for the p50/p95 in the JSON summary.
+MAX_SAMPLES = 5000
+
+
+def percentile(values: list, fraction: float) -> float:
+    """
+    Nearest-rank percentile (the smallest value with at least `fraction` of the values at
+    or below it), rounded to 3 digits, or None for an empty list. Shared with
+    bench/run_bench.py so both report the same numbers.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))
+    return round(ordered[index], 3)
+
+
+class Metrics:
+    """
+    Per-stage timing histograms, error counters and in-flight gauges for the pipeline.
+    Safe to use from the event loop and worker threads alike:
+
+        with METRICS.span("genre"):
+            ...
+
+    or decorate a function (sync or async) with @METRICS.timed("genre"). An exception
+    leaving a span counts as an error; stages that catch their own errors report them
+    with record_error().
+    """
+
+    def __init__(self, prefix: str = "techceo"):
+        self.prefix = prefix
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    def _stage(self, name: str) -> dict:
+        # Callers hold the lock.
+        if name not in self._stages:
+            self._stages[name] = {
+                "count": 0, "errors": 0, "in_flight": 0, "sum": 0.0, "max": 0.0,
+                "buckets": [0] * (len(DURATION_BUCKETS) + 1),
+                "samples": deque(maxlen=MAX_SAMPLES),
+            }
+        return self._stages[name]
+
+    @contextmanager
+    def span(self, name: str):
+        with self._lock:
+            self._stage(name)["in_flight"] += 1
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, failed=failed, finished_in_flight=True)
+
+    def timed(self, name: str):
+        """
+        Decorator that wraps every call of a function in span(name).
+        """
+        def decorator(function):
+            if asyncio.iscoroutinefunction(function):
+                @functools.wraps(function)
+                async def async_wrapper(*args, **kwargs):
+                    with self.span(name):
+                        return await function(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name: str, seconds: float, failed: bool = False, finished_in_flight: bool = False):
+        with self._lock:
+            stage = self._stage(name)
+            if finished_in_flight:
+                stage["in_flight"] -= 1
+            stage["count"] += 1
+            stage["sum"] += seconds
+            stage["max"] = max(stage["max"], seconds)
+            stage["samples"].append(seconds)
+            if failed:
+                stage["errors"] += 1
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    stage["buckets"][i] += 1
+                    break
+            else:
+                stage["buckets"][-1] += 1
+
+    def record_error(self, name: str):
+        """
+        Counts a failure that the stage handled itself (e.g. it returned "" instead of raising).
+        """
+        with self._lock:
+            self._stage(name)["errors"] += 1
+
+    def state(self) -> dict:
+        """
+        Picklable copy of the raw counters, for merge() in another process.
+        """
+        with self._lock:
+            return {name: dict(stage, samples=list(stage["samples"]), buckets=list(stage["buckets"])) for name, stage in self._stages.items()}
+
+    def merge(self, state: dict):
+        """
+        Adds the counters from another process's state(), e.g. a --processes shard.
+        """
+        with self._lock:
+            for name, other in state.items():
+                stage = self._stage(name)
+                for field in ("count", "errors", "sum"):
+                    stage[field] += other[field]
+                stage["max"] = max(stage["max"], other["max"])
+                stage["buckets"] = [a + b for a, b in zip(stage["buckets"], other["buckets"])]
+                stage["samples"].extend(other["samples"])
+
+    def summary(self, extra: dict = None) -> dict:
+        """
+        JSON-friendly summary: count, errors, in-flight, total/mean/p50/p95/max seconds per stage.
+        """
+        stages = {}
+        for name, stage in sorted(self.state().items()):
+            samples = stage["samples"]
+            stages[name] = {
+                "count": stage["count"],
+                "errors": stage["errors"],
+                "in_flight": stage["in_flight"],
+                "total_seconds": round(stage["sum"], 3),
+                "mean_seconds": round(stage["sum"] / stage["count"], 3) if stage["count"] else None,
+                "p50_seconds": percentile(samples, 0.50),
+                "p95_seconds": percentile(samples, 0.95),
+                "max_seconds": round(stage["max"], 3),
+            }
+        summary = {"started": self.started, "uptime_seconds": round(time.time() - self.started, 3), "stages": stages}
+        if extra:
+            summary.update(extra)
+        return summary
+
+    def write_summary(self, path: str, extra: dict = None):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(extra), f, indent=2)
+        print(f"Saved stage metrics to {path}")
+
+    def print_table(self):
+        """
+        Prints one line per stage, slowest total time first.
+        """
+        stages = self.summary()["stages"]
+        if not stages:
+            return
+        print("Stage timings (count, errors, mean / p95 / max seconds, total seconds):")
+        for name, stage in sorted(stages.items(), key=lambda item: -item[1]["total_seconds"]):
+            print(
+                f"  {name:<22} {stage['count']:>5} {stage['errors']:>4}  "
+                f"{stage['mean_seconds']} / {stage['p95_seconds']} / {stage['max_seconds']}  {stage['total_seconds']}"
+            )
+
+    def prometheus_text(self) -> str:
+        """
+        Renders the metrics in the Prometheus text exposition format.
+        """
+        p = self.prefix
+        state = self.state()
+        lines = [
+            f"# HELP {p}_stage_duration_seconds Time spent in each pipeline stage.",
+            f"# TYPE {p}_stage_duration_seconds histogram",
+        ]
+        for name, stage in sorted(state.items()):
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS, stage["buckets"]):
+                cumulative += count
+                lines.append(f'{p}_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{p}_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {stage["count"]}')
+            lines.append(f'{p}_stage_duration_seconds_sum{{stage="{name}"}} {stage["sum"]:.6f}')
+            lines.append(f'{p}_stage_duration_seconds_count{{stage="{name}"}} {stage["count"]}')
+        lines += [f"# HELP {p}_stage_errors_total Failed runs of each pipeline stage.", f"# TYPE {p}_stage_errors_total counter"]
+        lines += [f'{p}_stage_errors_total{{stage="{name}"}} {stage["errors"]}' for name, stage in sorted(state.items())]
+        lines += [f"# HELP {p}_stage_in_flight Runs of each pipeline stage in progress.", f"# TYPE {p}_stage_in_flight gauge"]
+        lines += [f'{p}_stage_in_flight{{stage="{name}"}} {stage["in_flight"]}' for name, stage in sorted(state.items())]
+        return "\n".join(lines) + "\n"
+
+
+async def start_metrics_server(metrics: Metrics, host: str, port: int):
+    """
+    Serves GET /metrics in Prometheus text format on its own port, for long-running workers.
+    Returns the aiohttp runner; call `await runner.cleanup()` to stop it.
+    """
+    from aiohttp import web
+
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.prometheus_text(), content_type="text/plain", charset="utf-8")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Serving metrics on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,273 @@
+import json
+import re
+from html.parser import HTMLParser
+from urllib.parse import parse_qs, urljoin, urlsplit
+
+# Link text or paths that lead to the pages of a tool's site worth reading, by section.
+SECTION_LINK_PATTERNS = {
+    "pricing": re.compile(r"pricing|plans", re.IGNORECASE),
+    "docs": re.compile(r"\bdocs?\b|documentation|help cent(?:er|re)|\bguides?\b|developers?\b", re.IGNORECASE),
+    "about": re.compile(r"\babout\b|our story|\bcompany\b", re.IGNORECASE),
+}
+LOGO_PATTERN = re.compile(r"logo", re.IGNORECASE)
+# Hosts of the social profiles worth mentioning in a post, by network.
+SOCIAL_HOSTS = {
+    "twitter.com": "twitter", "x.com": "twitter", "linkedin.com": "linkedin", "facebook.com": "facebook",
+    "instagram.com": "instagram", "github.com": "github", "discord.gg": "discord", "discord.com": "discord",
+    "tiktok.com": "tiktok", "t.me": "telegram", "reddit.com": "reddit", "youtube.com": "youtube",
+}
+# Share buttons point at these paths rather than at the tool's own profile.
+SOCIAL_SHARE_PATTERN = re.compile(r"/(?:share|sharer|intent|home\?status)", re.IGNORECASE)
+YOUTUBE_ID_PATTERN = re.compile(r"^[\w-]{11}$")
+# Images smaller than this (in px, either side) are icons or spacers, not thumbnails.
+MIN_IMAGE_SIDE = 100
+MIN_ICON_SIDE = 128
+
+
+def _largest_side(sizes: str) -> int:
+    # "16x16 32x32" -> 32, "any" (SVG) -> 0
+    sides = [int(side) for side in re.findall(r"(\d+)x\d+", sizes or "", re.IGNORECASE)]
+    return max(sides) if sides else 0
+
+
+def youtube_video_id(url: str) -> str:
+    """
+    Returns the video id of a YouTube watch, short or embed URL, or "".
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return ""
+    host = parts.netloc.lower().removeprefix("www.").removeprefix("m.")
+    video_id = ""
+    if host == "youtu.be":
+        video_id = parts.path.strip("/").split("/")[0]
+    elif host in ("youtube.com", "youtube-nocookie.com"):
+        if parts.path == "/watch":
+            video_id = parse_qs(parts.query).get("v", [""])[0]
+        elif parts.path.startswith(("/embed/", "/shorts/", "/v/")):
+            video_id = parts.path.split("/")[2]
+    return video_id if YOUTUBE_ID_PATTERN.match(video_id) else ""
+
+
+class _MetadataParser(HTMLParser):
+    """
+    Collects every field of extract_metadata() in one streaming pass over the start tags,
+    without building a document tree.
+    """
+
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.record = empty_metadata()
+        self._seen = set()
+        self._link = None
+        self._in_title = False
+
+    def _url(self, value: str) -> str:
+        value = (value or "").strip()
+        if not value or value.startswith(("data:", "javascript:", "mailto:", "#")):
+            return ""
+        return urljoin(self.base_url, value)
+
+    def _add(self, field: str, value):
+        key = (field, json.dumps(value, sort_keys=True))
+        if value and key not in self._seen:
+            self._seen.add(key)
+            self.record[field].append(value)
+
+    def _add_video(self, url: str):
+        video_id = youtube_video_id(url)
+        if video_id:
+            self._add("youtube_videos", f"https://www.youtube.com/watch?v={video_id}")
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {name: value or "" for name, value in attrs}
+        if tag == "base" and attrs.get("href"):
+            self.base_url = urljoin(self.base_url, attrs["href"])
+        elif tag == "title":
+            self._in_title = not self.record["title"]
+        elif tag == "meta":
+            name = (attrs.get("property") or attrs.get("name") or "").lower()
+            content = attrs.get("content", "").strip()
+            if name in ("og:image", "og:image:url", "og:image:secure_url"):
+                self._add("og_images", self._url(content))
+            elif name in ("twitter:image", "twitter:image:src"):
+                self._add("twitter_images", self._url(content))
+            elif name in ("description", "og:description") and not self.record["description"]:
+                self.record["description"] = content
+            elif name == "og:site_name":
+                self.record["site_name"] = content
+            elif name in ("og:video", "og:video:url", "og:video:secure_url"):
+                self._add_video(content)
+        elif tag == "link":
+            rel = attrs.get("rel", "").lower().split()
+            url = self._url(attrs.get("href"))
+            if not url:
+                return
+            if "manifest" in rel and not self.record["manifest_url"]:
+                self.record["manifest_url"] = url
+            elif "apple-touch-icon" in rel or "apple-touch-icon-precomposed" in rel:
+                self._add("apple_touch_icons", {"url": url, "size": _largest_side(attrs.get("sizes")) or 180})
+            elif "icon" in rel or "mask-icon" in rel:
+                self._add("favicons", {"url": url, "size": _largest_side(attrs.get("sizes"))})
+        elif tag == "img":
+            url = self._url(attrs.get("src") or attrs.get("data-src"))
+            if not url:
+                return
+            names = " ".join((attrs.get("alt", ""), attrs.get("class", ""), attrs.get("id", ""), url.rsplit("/", 1)[-1]))
+            if LOGO_PATTERN.search(names):
+                self._add("logo_images", url)
+            try:
+                if int(attrs.get("width", "0")) > MIN_IMAGE_SIDE and int(attrs.get("height", "0")) > MIN_IMAGE_SIDE:
+                    self._add("large_images", url)
+            except ValueError:
+                pass
+        elif tag in ("iframe", "embed"):
+            self._add_video(attrs.get("src") or attrs.get("data-src") or "")
+        elif tag == "lite-youtube" and YOUTUBE_ID_PATTERN.match(attrs.get("videoid", "")):
+            self._add("youtube_videos", f"https://www.youtube.com/watch?v={attrs['videoid']}")
+        elif tag == "a":
+            url = self._url(attrs.get("href"))
+            if url:
+                self._link = {"url": url, "text": []}
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag == "a" and self._link:
+            self._finish_link(self._link["url"], " ".join(self._link["text"]))
+            self._link = None
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.record["title"] += data
+        if self._link is not None:
+            self._link["text"].append(data.strip())
+
+    def _finish_link(self, url: str, text: str):
+        parts = urlsplit(url)
+        host = parts.netloc.lower().removeprefix("www.")
+        if youtube_video_id(url):
+            self._add_video(url)
+        elif host in SOCIAL_HOSTS:
+            if parts.path.strip("/") and not SOCIAL_SHARE_PATTERN.search(parts.path + "?" + parts.query):
+                self.record["social_links"].setdefault(SOCIAL_HOSTS[host], url)
+        elif parts.scheme in ("http", "https"):
+            for section, pattern in SECTION_LINK_PATTERNS.items():
+                # Links named "Pricing" come before links that only have it in the path.
+                if pattern.search(text):
+                    self._add(f"{section}_links", url)
+                    break
+                if pattern.search(parts.path):
+                    self._add(f"_{section}_paths", url)
+                    break
+
+
+def empty_metadata() -> dict:
+    return {
+        "title": "", "description": "", "site_name": "",
+        "og_images": [], "twitter_images": [], "logo_images": [], "large_images": [],
+        "apple_touch_icons": [], "favicons": [], "manifest_url": "", "manifest_icons": [],
+        "pricing_links": [], "_pricing_paths": [], "docs_links": [], "_docs_paths": [], "about_links": [], "_about_paths": [],
+        "social_links": {}, "youtube_videos": [],
+    }
+
+
+def extract_metadata(html_content: str, base_url: str) -> dict:
+    """
+    Reads everything the later stages need from a tool's home page in one pass:
+    og/twitter images, logo and large <img>s, apple-touch icons, favicons, the web
+    manifest URL, pricing, docs and about links, social profile links and YouTube videos
+    on the page.
+    URLs are absolute and in page order. Fill in "manifest_icons" with manifest_icons()
+    when the manifest is fetched.
+    """
+    parser = _MetadataParser(base_url)
+    if html_content:
+        try:
+            parser.feed(html_content)
+            parser.close()
+        except Exception as e:
+            # Keep whatever was found before the markup the parser choked on.
+            print(f"Error reading page metadata: {e}")
+    record = parser.record
+    record["title"] = " ".join(record["title"].split())
+    for section in SECTION_LINK_PATTERNS:
+        links = record[f"{section}_links"]
+        links += [url for url in record.pop(f"_{section}_paths") if url not in links]
+    return record
+
+
+def _site(host: str) -> str:
+    # "docs.example.com" -> "example.com"
+    return ".".join(host.lower().removeprefix("www.").split(".")[-2:])
+
+
+def same_site_links(metadata: dict, section: str, page_url: str) -> list[str]:
+    """
+    The section's links (e.g. "pricing") that stay on the site of `page_url`, leaving out
+    `page_url` itself. Fragments are dropped.
+    """
+    site = _site(urlsplit(page_url).hostname or "")
+    home = page_url.split("#")[0].rstrip("/")
+    links = []
+    for url in metadata.get(f"{section}_links", []):
+        url = url.split("#")[0]
+        if _site(urlsplit(url).hostname or "") == site and url.rstrip("/") != home and url not in links:
+            links.append(url)
+    return links
+
+
+def section_links(metadata: dict, page_url: str, budget: int) -> list[tuple[str, str]]:
+    """
+    Picks up to `budget` (section, url) pages to read besides `page_url`: the first
+    pricing, docs and about link that stays on the tool's own site, in that order.
+    """
+    chosen = []
+    for section in SECTION_LINK_PATTERNS:
+        for url in same_site_links(metadata, section, page_url):
+            if url not in (u for _, u in chosen):
+                chosen.append((section, url))
+                break
+    return chosen[:max(0, budget)]
+
+
+def manifest_icons(manifest_text: str, manifest_url: str) -> list[dict]:
+    """
+    Parses a web app manifest into [{"url", "size"}] icons, largest first.
+    """
+    try:
+        icons = json.loads(manifest_text).get("icons", [])
+    except (ValueError, AttributeError):
+        return []
+    found = [
+        {"url": urljoin(manifest_url, icon["src"]), "size": _largest_side(icon.get("sizes"))}
+        for icon in icons if isinstance(icon, dict) and icon.get("src")
+    ]
+    return sorted(found, key=lambda icon: -icon["size"])
+
+
+def needs_manifest(metadata: dict) -> bool:
+    """
+    True when the page offers nothing better than its web manifest icons.
+    """
+    return bool(metadata.get("manifest_url")) and not (
+        metadata["og_images"] or metadata["twitter_images"] or metadata["logo_images"] or metadata["apple_touch_icons"]
+    )
+
+
+def image_candidates(metadata: dict) -> list[str]:
+    """
+    Image URLs from the metadata, best first: og/twitter images, logos, apple-touch
+    and manifest icons, large images on the page, then favicons big enough to show.
+    """
+    icons = sorted(metadata["apple_touch_icons"], key=lambda icon: -icon["size"])
+    candidates = (
+        metadata["og_images"] + metadata["twitter_images"] + metadata["logo_images"]
+        + [icon["url"] for icon in icons]
+        + [icon["url"] for icon in metadata["manifest_icons"] if icon["size"] >= MIN_ICON_SIDE]
+        + metadata["large_images"]
+        + [icon["url"] for icon in sorted(metadata["favicons"], key=lambda icon: -icon["size"]) if icon["size"] >= MIN_ICON_SIDE]
+    )
+    return list(dict.fromkeys(candidates))
@@ -0,0 +1,139 @@
+import datetime
+import json
+import os
+import threading
+
+# Days of ledger files kept, for looking back at past spending.
+LEDGER_KEEP_DAYS = 7
+
+# Google API quotas reset at midnight Pacific time.
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:
+    # No tz database (e.g. Windows without the tzdata package): use Pacific standard time.
+    QUOTA_TIMEZONE = datetime.timezone(datetime.timedelta(hours=-8))
+
+
+def quota_day() -> str:
+    return datetime.datetime.now(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+
+class QuotaLedger:
+    """
+    Tracks the units spent against a daily API quota, across runs and processes.
+    Every spend is appended to that quota day's JSONL file ("<path stem>-<day>.jsonl"), so
+    --processes shards can share one ledger. Today's total is kept in memory and only the
+    lines added since the last check are read. Files older than LEDGER_KEEP_DAYS are
+    removed when the day rolls over. `reserve` units are kept back, so a run stops
+    spending a little before the real limit is reached.
+    """
+
+    def __init__(self, path: str, daily_units: int, reserve: int = 0):
+        self.path = path
+        self.daily_units = daily_units
+        self.reserve = reserve
+        self.run_units = 0
+        self._lock = threading.Lock()
+        self._day = None
+        self._offset = 0
+        self._spent = 0
+
+    def _day_path(self, day: str) -> str:
+        root, ext = os.path.splitext(self.path)
+        return f"{root}-{day}{ext or '.jsonl'}"
+
+    def _refresh(self):
+        # Called with the lock held. Adds the lines appended since the last call, by any process.
+        today = quota_day()
+        if today != self._day:
+            self._day, self._offset, self._spent = today, 0, 0
+            self._prune()
+        try:
+            with open(self._day_path(today), "rb") as f:
+                f.seek(self._offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Still being written by another process.
+                        break
+                    self._offset += len(line)
+                    try:
+                        self._spent += json.loads(line).get("units", 0)
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+
+    def _prune(self):
+        root, ext = os.path.splitext(self.path)
+        directory, prefix = os.path.split(os.path.abspath(root))
+        cutoff = (datetime.datetime.now(QUOTA_TIMEZONE) - datetime.timedelta(days=LEDGER_KEEP_DAYS)).strftime("%Y-%m-%d")
+        try:
+            names = os.listdir(directory)
+        except OSError:
+            return
+        for name in names:
+            day = name[len(prefix) + 1:-len(ext or ".jsonl")]
+            if name.startswith(f"{prefix}-") and name.endswith(ext or ".jsonl") and len(day) == 10 and day < cutoff:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+    def _remaining(self) -> int:
+        if self.daily_units <= 0:
+            return 2 ** 31
+        return max(0, self.daily_units - self.reserve - self._spent)
+
+    def _record(self, units: int, details: dict):
+        entry = {"day": self._day, "units": units}
+        entry.update(details)
+        self.run_units += units
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self._day_path(self._day), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+        # Counts this line, and any another process added first.
+        self._refresh()
+
+    def spent_today(self) -> int:
+        with self._lock:
+            self._refresh()
+            return self._spent
+
+    def remaining(self) -> int:
+        """
+        Units that can still be spent today, after the reserve. Unlimited (a large number)
+        when daily_units is 0 or less.
+        """
+        with self._lock:
+            self._refresh()
+            return self._remaining()
+
+    def can_spend(self, units: int) -> bool:
+        return self.remaining() >= units
+
+    def try_spend(self, units: int, headroom: int = 0, **details) -> bool:
+        """
+        Records `units` spent if `units + headroom` are still available, checking and
+        recording under one lock so concurrent threads can't both take the last units.
+        `headroom` keeps room for a follow-up call. Returns False, spending nothing, if not.
+        """
+        with self._lock:
+            self._refresh()
+            if self._remaining() < units + headroom:
+                return False
+            self._record(units, details)
+            return True
+
+    def spend(self, units: int, **details):
+        """
+        Records units spent, e.g. spend(100, method="search.list").
+        """
+        with self._lock:
+            self._refresh()
+            self._record(units, details)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            return {"run_units": self.run_units, "spent_today": self._spent, "remaining_today": self._remaining()}
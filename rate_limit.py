@@ -0,0 +1,89 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter shared by worker threads (asyncio code calls the limited
+    functions through asyncio.to_thread).
+    Allows `rate` calls every `per` seconds, with bursts of up to `burst` calls.
+    A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate: float, per: float = 60.0, burst: int = 1):
+        self.rate = rate
+        self.per = per
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def configure(self, rate: float, per: float = None, burst: int = None):
+        """
+        Changes the limit in place (e.g. from command-line flags).
+        """
+        with self._lock:
+            self.rate = rate
+            if per is not None:
+                self.per = per
+            if burst is not None:
+                self.burst = max(1, burst)
+                self._tokens = min(self._tokens, float(self.burst))
+
+    def _reserve(self) -> float:
+        # Takes a token, going into debt if none are left, and returns how long
+        # the caller must wait for its turn. Debt keeps callers in arrival order.
+        with self._lock:
+            if self.rate <= 0:
+                return 0.0
+            now = time.monotonic()
+            tokens_per_second = self.rate / self.per
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated) * tokens_per_second)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / tokens_per_second
+
+    def acquire_sync(self):
+        """
+        Blocks the calling thread until a call is allowed under the configured rate.
+        """
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class HostRateLimiter:
+    """
+    A separate RateLimiter for every host, all with the same limit, so a service reached
+    on several hosts gets its budget per host. Call acquire_sync(url) before each request.
+    """
+
+    def __init__(self, rate: float, per: float = 60.0, burst: int = 1):
+        self.rate = rate
+        self.per = per
+        self.burst = max(1, burst)
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def configure(self, rate: float, per: float = None, burst: int = None):
+        with self._lock:
+            self.rate = rate
+            if per is not None:
+                self.per = per
+            if burst is not None:
+                self.burst = max(1, burst)
+            for limiter in self._limiters.values():
+                limiter.configure(rate, per, burst)
+
+    def for_url(self, url: str) -> RateLimiter:
+        host = (urlsplit(url).hostname or "").lower()
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = RateLimiter(self.rate, self.per, self.burst)
+            return self._limiters[host]
+
+    def acquire_sync(self, url: str):
+        self.for_url(url).acquire_sync()
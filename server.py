@@ -0,0 +1,166 @@
+import asyncio
+import os
+from urllib.parse import urlparse
+
+from aiohttp import web
+
+from job_queue import JobQueue, run_workers
+from urls import canonical_tool_url, is_public_host
+
+ALLOWED_ORIGIN = os.getenv("WEBHOOK_ALLOWED_ORIGIN", "*")
+# Form submissions are leased before bulk jobs (priority 0), so a user isn't stuck behind a tools file.
+WEBHOOK_PRIORITY = 10
+
+
+def validate_submission(payload) -> tuple[dict, str]:
+    """
+    Checks a tool_submission_form.html payload.
+    Returns (job fields, "") when valid, or (None, error message). Resolves the tool's
+    host, so call it off the event loop.
+    """
+    if not isinstance(payload, dict):
+        return None, "Expected a JSON object."
+    tool_name = str(payload.get("toolName") or "").strip()
+    tool_url = str(payload.get("toolUrl") or "").strip()
+    social_handle = str(payload.get("socialHandle") or "").strip()
+    if not tool_name or len(tool_name) > 200:
+        return None, "Please provide a tool name (up to 200 characters)."
+    # The name ends up in output file names (see gemini_main.tool_file_slug).
+    if "/" in tool_name or "\\" in tool_name or ".." in tool_name or not tool_name.isprintable():
+        return None, "The tool name can't contain slashes, \"..\" or control characters."
+    parsed = urlparse(tool_url if "://" in tool_url else f"https://{tool_url}")
+    if parsed.scheme not in ("http", "https") or not parsed.hostname or "." not in parsed.hostname:
+        return None, "Please provide a valid tool URL."
+    # The scraped page is served back through /preview, so internal addresses are refused.
+    if not is_public_host(parsed.hostname):
+        return None, "The tool URL must point to a public website."
+    if len(social_handle) > 100:
+        return None, "Social handle is too long."
+    return {
+        "tool_name": tool_name,
+        "tool_url": parsed.geturl(),
+        "contributor": social_handle or "AIC Community",
+    }, ""
+
+
+def read_text(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def create_app(queue: JobQueue, handle_job, workers: int = 2, queue_size: int = 50, on_cleanup=None, metrics=None, preview_path=None) -> web.Application:
+    """
+    Builds the ingestion server.
+    Submissions are validated, added to the durable job queue and answered with 202 and a
+    job id right away. `workers` background tasks in this process drain the queue with
+    `await handle_job(payload)`; with workers=0 the server only enqueues and separate
+    `gemini_main.py worker` processes do the work.
+    When `queue_size` submissions are already waiting, new ones get 429 so callers back off.
+    Only webhook jobs count towards it; they are also leased before bulk jobs from --enqueue.
+    `on_cleanup` is awaited on shutdown (e.g. to close the browser pool).
+    With `metrics` (a metrics.Metrics), GET /metrics serves them in Prometheus text format.
+    With `preview_path(tool_name)`, GET /jobs/{id}/preview serves the job's HTML preview,
+    including one that is still being streamed.
+    """
+    app = web.Application(client_max_size=64 * 1024)
+
+    def json_response(data: dict, status: int = 200, **kwargs) -> web.Response:
+        response = web.json_response(data, status=status, **kwargs)
+        response.headers["Access-Control-Allow-Origin"] = ALLOWED_ORIGIN
+        return response
+
+    def accepted(job_id: str, duplicate: bool) -> web.Response:
+        response = {"job_id": job_id, "status": "queued", "duplicate": duplicate, "status_url": f"/jobs/{job_id}"}
+        if preview_path:
+            response["preview_url"] = f"/jobs/{job_id}/preview"
+        return json_response(response, status=202)
+
+    async def submit(request: web.Request) -> web.Response:
+        try:
+            payload = await request.json()
+        except Exception:
+            return json_response({"message": "Request body must be JSON."}, status=400)
+        fields, error = await asyncio.to_thread(validate_submission, payload)
+        if error:
+            return json_response({"message": error}, status=400)
+        dedupe_key = canonical_tool_url(fields["tool_url"])
+        # A resubmitted tool gets its existing job back, even when the queue is full.
+        job_id = await asyncio.to_thread(queue.find_active, dedupe_key)
+        if job_id:
+            return accepted(job_id, duplicate=True)
+        counts = await asyncio.to_thread(queue.counts, "webhook")
+        if counts["queued"] >= queue_size:
+            return json_response(
+                {"message": "We're receiving a lot of submissions right now. Please try again in a minute."},
+                status=429, headers={"Retry-After": "60"},
+            )
+        job_id, created = await asyncio.to_thread(queue.enqueue, fields, dedupe_key, "webhook", WEBHOOK_PRIORITY)
+        return accepted(job_id, duplicate=not created)
+
+    async def job_status(request: web.Request) -> web.Response:
+        job = await asyncio.to_thread(queue.get, request.match_info["job_id"])
+        if job is None:
+            return json_response({"message": "Unknown job id."}, status=404)
+        return json_response({
+            "job_id": job["id"],
+            "status": job["status"],
+            "tool_name": job["payload"].get("tool_name"),
+            "tool_url": job["payload"].get("tool_url"),
+            "attempts": job["attempts"],
+            "error": job["last_error"],
+            "result": job["result"],
+        })
+
+    async def preview(request: web.Request) -> web.Response:
+        job = await asyncio.to_thread(queue.get, request.match_info["job_id"])
+        if job is None:
+            return json_response({"message": "Unknown job id."}, status=404)
+        path = preview_path(job["payload"].get("tool_name", ""))
+        if not os.path.exists(path):
+            # Until the first text arrives, keep the page reloading.
+            return web.Response(
+                text='<meta http-equiv="refresh" content="2"><p>Your preview is being prepared...</p>',
+                content_type="text/html", headers={"Access-Control-Allow-Origin": ALLOWED_ORIGIN},
+            )
+        content = await asyncio.to_thread(read_text, path)
+        return web.Response(text=content, content_type="text/html", headers={"Access-Control-Allow-Origin": ALLOWED_ORIGIN, "Cache-Control": "no-store"})
+
+    async def health(request: web.Request) -> web.Response:
+        counts = await asyncio.to_thread(queue.counts)
+        submissions = await asyncio.to_thread(queue.counts, "webhook")
+        return json_response(dict(counts, submissions_queued=submissions["queued"], queue_size=queue_size, workers=workers))
+
+    async def prometheus(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.prometheus_text(), content_type="text/plain", charset="utf-8")
+
+    async def preflight(request: web.Request) -> web.Response:
+        return web.Response(status=204, headers={
+            "Access-Control-Allow-Origin": ALLOWED_ORIGIN,
+            "Access-Control-Allow-Methods": "POST, GET, OPTIONS",
+            "Access-Control-Allow-Headers": "Content-Type",
+            "Access-Control-Max-Age": "86400",
+        })
+
+    async def start_workers(app: web.Application):
+        app["workers"] = None
+        if workers > 0:
+            app["workers"] = asyncio.create_task(run_workers(queue, handle_job, workers))
+
+    async def stop_workers(app: web.Application):
+        if app["workers"]:
+            app["workers"].cancel()
+            await asyncio.gather(app["workers"], return_exceptions=True)
+        if on_cleanup:
+            await on_cleanup()
+
+    app.router.add_post("/submit", submit)
+    app.router.add_route("OPTIONS", "/submit", preflight)
+    app.router.add_get("/jobs/{job_id}", job_status)
+    if preview_path is not None:
+        app.router.add_get("/jobs/{job_id}/preview", preview)
+    app.router.add_get("/health", health)
+    if metrics is not None:
+        app.router.add_get("/metrics", prometheus)
+    app.on_startup.append(start_workers)
+    app.on_cleanup.append(stop_workers)
+    return app
@@ -0,0 +1,132 @@
+import csv
+import json
+import os
+import re
+import threading
+import time
+
+from urls import canonical_tool_url
+
+# The generated post names the tool's site on this line (see PLAN_TEMPLATE), in plain text
+# or as a link once convert_links() has run.
+OFFICIAL_SITE_PATTERN = re.compile(r'Official Site:?\s*(?:<a [^>]*href="([^"]+)"|(\S+))')
+
+
+def normalize_tool_name(tool_name: str) -> str:
+    return " ".join(re.sub(r"[^\w\s]", " ", tool_name.lower()).split())
+
+
+class ToolIndex:
+    """
+    Persistent record of every tool that has a post, keyed by canonical_tool_url() and by
+    normalized name, holding the tool's CSV row. Lets batches and submissions skip tools
+    that were already written up, under any spelling of their URL.
+
+    Entries are appended to a JSONL file and the latest entry for a tool wins, so several
+    processes can add to one index; find() picks up entries other processes appended.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.by_url = {}
+        self.by_name = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+        self._reload()
+
+    def _reload(self):
+        # Reads only the lines appended since the last call.
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        # Still being written by another process.
+                        break
+                    self._offset += len(line)
+                    try:
+                        self._remember(json.loads(line))
+                    except (ValueError, KeyError):
+                        continue
+        except OSError:
+            pass
+
+    def _remember(self, entry: dict):
+        self.by_url[entry["url_key"]] = entry
+        if entry["name_key"]:
+            self.by_name[entry["name_key"]] = entry
+
+    def find(self, tool_name: str, tool_url: str) -> tuple[dict, str]:
+        """
+        Returns (entry, "url" or "name") for a tool already in the index, or (None, "").
+        A match on the URL is preferred over one on the name.
+        """
+        with self._lock:
+            self._reload()
+            entry = self.by_url.get(canonical_tool_url(tool_url))
+            if entry:
+                return entry, "url"
+            entry = self.by_name.get(normalize_tool_name(tool_name))
+            return (entry, "name") if entry else (None, "")
+
+    def entries(self) -> list[dict]:
+        """
+        The latest entry of every indexed tool, oldest first.
+        """
+        with self._lock:
+            self._reload()
+            return sorted(self.by_url.values(), key=lambda entry: entry["time"])
+
+    def add(self, tool_name: str, tool_url: str, row: dict, output_file: str = "", **details) -> dict:
+        """
+        Records a tool's CSV row (a CSV_HEADERS dict) and where it was written.
+        """
+        entry = {
+            "name": tool_name,
+            "url": tool_url,
+            "name_key": normalize_tool_name(tool_name),
+            "url_key": canonical_tool_url(tool_url),
+            "output": output_file,
+            "time": time.time(),
+            "row": row,
+        }
+        entry.update(details)
+        with self._lock:
+            self._reload()
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            # Picks up this entry along with anything another process added meanwhile.
+            self._reload()
+        return entry
+
+    def import_csv(self, csv_file: str) -> int:
+        """
+        Adds the rows of a CSV written before the index existed, taking each tool's URL
+        from the "Official Site" line of its post. Rows already indexed are left alone.
+        Returns the number of rows added.
+        """
+        if not os.path.exists(csv_file):
+            return 0
+        added = 0
+        with open(csv_file, "r", newline="", encoding="utf-8") as f:
+            try:
+                for row in csv.DictReader(f):
+                    if None in row or not row.get("Title"):
+                        continue
+                    match = OFFICIAL_SITE_PATTERN.search(row.get("Content") or "")
+                    if not match:
+                        continue
+                    tool_url = match.group(1) or match.group(2)
+                    if self.find(row["Title"], tool_url)[0] is None:
+                        self.add(row["Title"], tool_url, row, csv_file, source="import")
+                        added += 1
+            except csv.Error:
+                pass
+        return added
+
+    def __len__(self) -> int:
+        return len(self.by_url)
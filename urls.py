@@ -0,0 +1,60 @@
+import ipaddress
+import re
+import socket
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from and never change the page.
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "dclid", "yclid", "mc_cid", "mc_eid", "_hsenc", "_hsmi", "ref", "ref_src", "via"}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalizes a URL so the same page always maps to the same string:
+    adds https:// when no scheme is given, lowercases scheme and host, drops default ports,
+    fragments, tracking parameters and trailing slashes, and sorts the query string.
+    """
+    url = url.strip()
+    if not re.match(r'^[a-zA-Z][a-zA-Z0-9+.-]*://', url):
+        url = 'https://' + url
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower().rstrip(".")
+    port = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+    path = re.sub(r'/{2,}', '/', parts.path or "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def canonical_tool_url(url: str) -> str:
+    """
+    The URL a tool is known by, for spotting the same tool listed twice: canonicalize_url()
+    plus https for http and no leading "www.", so "http://www.example.com/?utm_source=x"
+    and "https://example.com" match. Not for fetching, since some sites only serve one form.
+    """
+    parts = urlsplit(canonicalize_url(url))
+    host = parts.netloc.removeprefix("www.")
+    return urlunsplit(("https", host, parts.path, parts.query, ""))
+
+
+def is_public_host(host: str) -> bool:
+    """
+    True if every address `host` resolves to is a public one. Private, loopback,
+    link-local (e.g. cloud metadata at 169.254.169.254) and other reserved addresses,
+    and hosts that don't resolve, give False.
+    """
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError, ValueError):
+        return False
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            return False
+    return bool(infos)